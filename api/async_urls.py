@@ -0,0 +1,11 @@
+from django.urls import path
+from . import async_views
+
+# Async read endpoints, mounted under /api/async/ (see program_viewer/asgi.py)
+urlpatterns = [
+    path('sessions/', async_views.session_list, name='async-session-list'),
+    path('sessions/<int:pk>/', async_views.session_detail, name='async-session-detail'),
+    path('session-entries/', async_views.session_entry_list, name='async-session-entry-list'),
+    path('exercises/', async_views.exercise_list, name='async-exercise-list'),
+    path('auth/me/', async_views.user_detail, name='async-user-detail'),
+]
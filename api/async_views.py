@@ -0,0 +1,183 @@
+"""
+Native async versions of the hot read endpoints.
+
+These are plain Django async views rather than DRF viewsets (DRF has no async
+support). Under an ASGI server (see program_viewer/asgi.py) a request waiting
+on PostgreSQL no longer holds a worker thread. Responses match the sync
+endpoints they mirror.
+
+The tenant is set with user_schema_context(); the context variable is copied
+into the thread that runs each async ORM query, where the connection's
+search_path is bound to it.
+"""
+import asyncio
+import json
+import math
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+
+from base.models import Session
+from base.serializers import UserSerializer
+from base.utils.archive import archived_sessions
+from base.utils.events import get_broker
+from base.utils.metrics import time_section
+from base.utils.user_context import user_schema_context
+from .querysets import session_list_queryset, session_detail_queryset, entry_list_queryset, exercise_queryset
+from .serialisers import SessionDetailSerializer, SessionEntryDetailSerializer, ExerciseDetailSerializer
+from .throttling import date_range_cost, entry_list_cost, throttle_wait
+
+
+# Comment line sent on idle event streams so proxies keep the connection open
+HEARTBEAT_SECONDS = 15
+
+
+async def authenticate(request):
+    """Return the JWT user for request, or None"""
+    try:
+        result = await sync_to_async(JWTAuthentication().authenticate)(request)
+    except (InvalidToken, AuthenticationFailed):
+        return None
+    return result[0] if result else None
+
+
+async def authenticate_query_token(request):
+    """Return the user for a ?token= access token (EventSource cannot send headers), or None"""
+    raw_token = request.GET.get('token')
+    if not raw_token:
+        return None
+    auth = JWTAuthentication()
+    try:
+        validated = auth.get_validated_token(raw_token.encode())
+        return await sync_to_async(auth.get_user)(validated)
+    except (InvalidToken, TokenError, AuthenticationFailed):
+        return None
+
+
+def async_login_required(view):
+    """Authenticate the JWT on an async view and pass the user in (401 otherwise)"""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method != 'GET':
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        user = await authenticate(request)
+        if user is None or not user.is_active:
+            return JsonResponse(
+                {'detail': 'Authentication credentials were not provided.'},
+                status=401
+            )
+        return await view(request, user, *args, **kwargs)
+    return wrapper
+
+
+def async_throttle(scope=None, cost=1):
+    """
+    Token-bucket throttling for an async view (DRF throttles only run on APIViews),
+    applied inside async_login_required. cost is a number or a function of the request.
+    """
+    def decorator(view):
+        @wraps(view)
+        async def wrapper(request, user, *args, **kwargs):
+            request_cost = cost(request) if callable(cost) else cost
+            wait = await sync_to_async(throttle_wait)(f'user:{user.pk}', request_cost, scope)
+            if wait:
+                response = JsonResponse(
+                    {'detail': f'Request was throttled. Expected available in {math.ceil(wait)} seconds.'},
+                    status=429
+                )
+                response['Retry-After'] = str(math.ceil(wait))
+                return response
+            return await view(request, user, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@async_login_required
+@async_throttle('sessions', lambda request: date_range_cost(request.GET))
+async def session_list(request, user):
+    """GET /api/async/sessions/ - same filters as SessionViewSet.list"""
+    with user_schema_context(user):
+        sessions = [s async for s in session_list_queryset(user, request.GET)]
+        archived = await sync_to_async(archived_sessions)(user, request.GET)
+    with time_section('serialize'):
+        data = archived + SessionDetailSerializer(sessions, many=True).data
+    return JsonResponse(data, safe=False)
+
+
+@async_login_required
+@async_throttle('sessions')
+async def session_detail(request, user, pk):
+    """GET /api/async/sessions/{id}/"""
+    with user_schema_context(user):
+        try:
+            session = await session_detail_queryset(user).aget(id=pk)
+        except Session.DoesNotExist:
+            return JsonResponse({'detail': 'Not found'}, status=404)
+    with time_section('serialize'):
+        data = SessionDetailSerializer(session).data
+    return JsonResponse(data)
+
+
+@async_login_required
+@async_throttle('sessions', lambda request: entry_list_cost(request.GET))
+async def session_entry_list(request, user):
+    """GET /api/async/session-entries/ - same filters as SessionEntryViewSet.list"""
+    with user_schema_context(user):
+        entries = [e async for e in entry_list_queryset(user, request.GET)]
+    with time_section('serialize'):
+        data = SessionEntryDetailSerializer(entries, many=True).data
+    return JsonResponse(data, safe=False)
+
+
+async def exercise_list(request):
+    """GET /api/async/exercises/ - shared catalog, no authentication required"""
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    exercises = [e async for e in exercise_queryset(request.GET)]
+    return JsonResponse(ExerciseDetailSerializer(exercises, many=True).data, safe=False)
+
+
+@async_login_required
+@async_throttle()
+async def user_detail(request, user):
+    """GET /api/async/auth/me/"""
+    return JsonResponse(UserSerializer(user).data)
+
+
+async def event_stream(request):
+    """
+    GET /api/events/ - Server-Sent Events stream of the user's session and entry
+    changes (see base/utils/events.py). Authenticate with the Authorization header
+    or ?token=<access token>. Each message is JSON {"type": ..., "data": ...};
+    "resync" means events may have been missed and the client should refetch.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+    user = await authenticate(request) or await authenticate_query_token(request)
+    if user is None or not user.is_active:
+        return JsonResponse({'detail': 'Authentication credentials were not provided.'}, status=401)
+
+    async def events():
+        broker = get_broker()
+        queue = broker.subscribe(user.id)
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': heartbeat\n\n'
+                    continue
+                yield f'data: {json.dumps(event)}\n\n'
+        finally:
+            # Also runs when the client disconnects and Django cancels the stream
+            broker.unsubscribe(user.id, queue)
+
+    response = StreamingHttpResponse(events(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
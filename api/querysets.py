@@ -0,0 +1,68 @@
+"""
+Queryset builders shared by the sync DRF viewsets and the async read views.
+"""
+from django.db.models import Exists, OuterRef, Prefetch
+from base.models import Session, SessionEntry, Exercise
+
+
+def session_entries_queryset():
+    """Entries with everything SessionEntryDetailSerializer renders joined in"""
+    return SessionEntry.objects.select_related(
+        'exercise__muscle_group', 'exercise__exercise_type'
+    )
+
+
+def session_list_queryset(user, params):
+    """Sessions for user filtered by the date_from/date_to/exercise_id/muscle_group_id params"""
+    queryset = Session.objects.filter(user=user).prefetch_related(
+        Prefetch('sessionentry_set', queryset=session_entries_queryset())
+    )
+    
+    if date_from := params.get('date_from'):
+        queryset = queryset.filter(date__gte=date_from)
+    if date_to := params.get('date_to'):
+        queryset = queryset.filter(date__lte=date_to)
+    # Correlated EXISTS instead of join + DISTINCT: no de-duplication pass over the
+    # joined rows, and the planner can semi-join on the (exercise_id, session_id) index
+    if exercise_id := params.get('exercise_id'):
+        queryset = queryset.filter(Exists(
+            SessionEntry.objects.filter(session_id=OuterRef('pk'), exercise_id=exercise_id)
+        ))
+    if muscle_group_id := params.get('muscle_group_id'):
+        queryset = queryset.filter(Exists(
+            SessionEntry.objects.filter(
+                session_id=OuterRef('pk'),
+                exercise__muscle_group_id=muscle_group_id
+            )
+        ))
+    return queryset
+
+
+def session_detail_queryset(user):
+    return Session.objects.filter(user=user).prefetch_related(
+        Prefetch('sessionentry_set', queryset=session_entries_queryset())
+    )
+
+
+def entry_list_queryset(user, params):
+    """Entries of user's sessions filtered by the session/exercise params"""
+    queryset = session_entries_queryset().filter(session__user=user)
+    
+    if session_id := params.get('session'):
+        queryset = queryset.filter(session_id=session_id)
+    if exercise_id := params.get('exercise'):
+        queryset = queryset.filter(exercise_id=exercise_id)
+    return queryset
+
+
+def exercise_queryset(params):
+    """Exercise catalog filtered by the muscle_group/exercise_type/search params"""
+    queryset = Exercise.objects.select_related('muscle_group', 'exercise_type')
+    
+    if muscle_group := params.get('muscle_group'):
+        queryset = queryset.filter(muscle_group_id=muscle_group)
+    if exercise_type := params.get('exercise_type'):
+        queryset = queryset.filter(exercise_type_id=exercise_type)
+    if search := params.get('search'):
+        queryset = queryset.filter(exercise_name__icontains=search)
+    return queryset
@@ -1,7 +1,7 @@
 # Create model serialisers because the response object cannot natively handle complex data types
 from rest_framework import serializers
 from django.utils import timezone
-from base.models import Session, SessionEntry, Exercise, MuscleGroup, ExerciseType
+from base.models import Session, SessionEntry, Exercise, MuscleGroup, ExerciseType, Job
 
 # ===== Basic Serializers (for nesting) =====
 
@@ -87,4 +87,25 @@ class SessionEntryCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({'exercise': 'Exercise is required'})
         if not data.get('session'):
             raise serializers.ValidationError({'session': 'Session is required'})
-        return data
\ No newline at end of file
+        return data
+# ===== Background Jobs =====
+
+class JobSerializer(serializers.ModelSerializer):
+    """Read serializer for polling a background job"""
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'progress_done', 'progress_total', 'attempts', 'max_attempts',
+            'result', 'error', 'created_at', 'finished_at'
+        ]
+
+class JobCreateSerializer(serializers.Serializer):
+    """Submit a job: an export, or an import of an uploaded legacy session CSV"""
+    kind = serializers.ChoiceField(choices=['export_sessions', 'import_sessions'])
+    file = serializers.FileField(required=False)
+
+    def validate(self, data):
+        if data['kind'] == 'import_sessions' and not data.get('file'):
+            raise serializers.ValidationError({'file': 'A session CSV is required for imports'})
+        return data
@@ -0,0 +1,153 @@
+"""
+Token-bucket rate limits, per user (or client IP when anonymous).
+
+Every bucket in THROTTLE_BUCKETS holds up to `capacity` tokens and refills at
+`rate` tokens per second. A request spends tokens in proportion to what it
+costs the database: views declare throttle_cost, or get_throttle_cost() for
+costs that depend on the request (e.g. the date range of a list). Each request
+draws on the user's overall 'user' bucket and, if its view sets
+throttle_scope, on that endpoint's bucket too; it is only charged if both can
+pay, so a rejected request spends nothing.
+
+Buckets live in the 'throttle' cache (Redis when configured, otherwise per
+process; never the database). Each client's buckets are updated under a short
+lock taken with cache.add(), so concurrent requests can't both spend the same
+tokens; a request that finds the lock taken is turned away at once rather
+than waiting for it. Anonymous clients are identified by client_ip(), which
+only trusts X-Forwarded-For as far as NUM_PROXIES allows.
+"""
+import math
+import time
+from datetime import date
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.throttling import BaseThrottle
+from base.middleware import client_ip
+from base.utils.metrics import registry
+
+# scope: (capacity, refill tokens per second)
+DEFAULT_BUCKETS = {
+    'user': (200, 5.0),
+    'sessions': (60, 1.0),
+    'analytics': (30, 0.5),
+    'jobs': (60, 1.0),
+    'register': (60, 1 / 20),
+}
+# Cost of listing a whole history, and how many days of an explicit range cost one token
+FULL_HISTORY_COST = 10
+DAYS_PER_TOKEN = 90
+# Submitting an import/export job, and registering (creates the tenant's schema and tables)
+JOB_COST = 20
+REGISTER_COST = 20
+# A client's bucket lock expires after this long even if its holder died
+LOCK_TIMEOUT = 5
+# Retry-After for a request that found its client's buckets locked by another
+LOCK_RETRY_AFTER = 1
+
+
+def bucket_config(scope: str):
+    return getattr(settings, 'THROTTLE_BUCKETS', DEFAULT_BUCKETS).get(scope)
+
+
+def consume(ident: str, costs: dict):
+    """
+    Take costs[scope] tokens from each of ident's buckets, or nothing at all if
+    any of them is short. Returns (0, None, None) if the request may proceed,
+    otherwise (seconds until it could retry, rejection reason, scope): reason
+    is 'throttled', or 'lock_contention' if another of the client's requests
+    was updating its buckets at the same moment.
+    """
+    buckets = {}
+    for scope, cost in costs.items():
+        config = bucket_config(scope) if scope else None
+        if config is not None and cost > 0:
+            capacity, rate = config
+            # A request costing more than the bucket holds would never get through
+            buckets[f'throttle:{scope}:{ident}'] = (scope, min(cost, capacity), capacity, rate)
+    if not buckets:
+        return 0.0, None, None
+
+    cache = caches['throttle']
+    lock_key = f'throttle-lock:{ident}'
+    if not cache.add(lock_key, 1, timeout=LOCK_TIMEOUT):
+        return LOCK_RETRY_AFTER, 'lock_contention', next(iter(buckets.values()))[0]
+    try:
+        now = time.time()
+        stored = cache.get_many(list(buckets))
+        wait, rejected_by = 0.0, None
+        updated = {}
+        for key, (scope, cost, capacity, rate) in buckets.items():
+            tokens, last = stored.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - last) * rate)
+            if tokens < cost and (cost - tokens) / rate > wait:
+                wait, rejected_by = (cost - tokens) / rate, scope
+            updated[key] = (tokens - cost, now)
+        if wait:
+            return wait, 'throttled', rejected_by
+        timeout = max(math.ceil(capacity / rate) for _, _, capacity, rate in buckets.values()) + 1
+        cache.set_many(updated, timeout=timeout)
+        return 0.0, None, None
+    finally:
+        cache.delete(lock_key)
+
+
+def date_range_cost(params) -> int:
+    """Cost of a list filtered by date_from/date_to: unbounded lists return the whole history"""
+    try:
+        date_from = date.fromisoformat(params['date_from'])
+        date_to = date.fromisoformat(params.get('date_to') or date.today().isoformat())
+    except (KeyError, ValueError):
+        return FULL_HISTORY_COST
+    days = max(0, (date_to - date_from).days) + 1
+    return min(FULL_HISTORY_COST, math.ceil(days / DAYS_PER_TOKEN))
+
+
+def entry_list_cost(params) -> int:
+    """Cost of an entry list: without a session filter it returns every entry of the history"""
+    return 1 if params.get('session') else FULL_HISTORY_COST
+
+
+def throttle_wait(ident: str, cost: float, scope: str = None) -> float:
+    """
+    Charge a request to ident's 'user' bucket and its scope's bucket (for views
+    outside DRF). Returns 0, or the seconds to wait after a rejection.
+    """
+    if not getattr(settings, 'THROTTLING_ENABLED', True):
+        return 0.0
+    wait, reason, rejected_by = consume(ident, {'user': cost, scope: cost})
+    if wait:
+        record_rejection(reason, rejected_by)
+    return wait
+
+
+def record_rejection(reason: str, scope: str):
+    registry.increment('http_requests_rejected_total', (('reason', reason), ('scope', scope)))
+
+
+class TokenBucketThrottle(BaseThrottle):
+    """
+    DRF throttle spending the request's weighted cost from the client's 'user'
+    bucket and, for views that set throttle_scope, that endpoint's bucket
+    """
+
+    def get_ident_key(self, request):
+        if request.user and request.user.is_authenticated:
+            return f'user:{request.user.pk}'
+        return f'ip:{client_ip(request)}'
+
+    def get_cost(self, request, view):
+        get_throttle_cost = getattr(view, 'get_throttle_cost', None)
+        if get_throttle_cost is not None:
+            return get_throttle_cost(request)
+        return getattr(view, 'throttle_cost', 1)
+
+    def allow_request(self, request, view):
+        self._wait = 0.0
+        if not getattr(settings, 'THROTTLING_ENABLED', True):
+            return True
+        cost = self.get_cost(request, view)
+        self._wait = throttle_wait(self.get_ident_key(request), cost, getattr(view, 'throttle_scope', None))
+        return not self._wait
+
+    def wait(self):
+        return self._wait
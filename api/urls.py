@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import views
+from . import views, async_views
 
 # Create a router and register ViewSets
 router = DefaultRouter()
@@ -8,7 +8,12 @@ router.register(r'exercises', views.ExerciseViewSet, basename='exercise')
 router.register(r'sessions', views.SessionViewSet, basename='session')
 router.register(r'session-entries', views.SessionEntryViewSet, basename='session-entry')
 router.register(r'muscle-groups', views.MuscleGroupViewSet, basename='muscle-group')
+router.register(r'jobs', views.JobViewSet, basename='job')
 
 urlpatterns = [
+    path('_metrics', views.MetricsView.as_view(), name='metrics'),
+    path('analytics/', views.AnalyticsView.as_view(), name='analytics'),
+    # Server-Sent Events (async, serve via ASGI)
+    path('events/', async_views.event_stream, name='events'),
     path('', include(router.urls)),
 ]
\ No newline at end of file
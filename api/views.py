@@ -1,33 +1,82 @@
 from rest_framework import viewsets, status
+from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
+from rest_framework.permissions import IsAuthenticated, BasePermission, SAFE_METHODS
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter
-from django.db import connection
+from django.conf import settings
+import hmac
+import os
+from django.db import transaction
+from django.http import HttpResponse, FileResponse
 
-from base.models import Session, Exercise, SessionEntry, MuscleGroup
+from base.db_routers import set_replica_reads, reset_replica_reads, pin_to_primary, is_pinned_to_primary
+from base.jobs import enqueue, job_file_path
+from base.models import Session, Exercise, SessionEntry, MuscleGroup, Job
+from base.utils.analytics import get_analytics, invalidate_analytics
+from base.utils.archive import archived_sessions
+from base.utils.events import publish_event
+from base.utils.metrics import registry, time_section
+from base.utils.exercise_search import get_index
+from base.utils.user_context import set_current_tenant, reset_current_tenant
+from .throttling import JOB_COST, date_range_cost, entry_list_cost
+from .querysets import session_list_queryset, session_detail_queryset, entry_list_queryset
 from .serialisers import (
     SessionDetailSerializer, SessionCreateSerializer,
     ExerciseDetailSerializer, ExerciseCreateSerializer,
     SessionEntryDetailSerializer, SessionEntryCreateSerializer,
-    MuscleGroupSerializer
+    MuscleGroupSerializer, JobSerializer, JobCreateSerializer
 )
 
 
 class UserSchemaViewSetMixin:
     """
-    Mixin that sets PostgreSQL schema context for authenticated user.
-    Automatically routes queries to the user's schema.
+    Mixin that sets the tenant context for the authenticated user.
+    Automatically routes queries to the user's schema for the rest of the request.
     """
     def dispatch(self, request, *args, **kwargs):
+        self._tenant_token = None
+        try:
+            return super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._tenant_token is not None:
+                reset_current_tenant(self._tenant_token)
+    
+    def initial(self, request, *args, **kwargs):
+        # DRF authenticates (JWT) in initial(), so the user is only known from here on
+        super().initial(request, *args, **kwargs)
         # Set schema context if user is authenticated
         if request.user and request.user.is_authenticated:
-            schema_name = f"user_{request.user.id}"
-            with connection.cursor() as cursor:
-                cursor.execute(f"SET search_path TO {schema_name}, public;")
-        return super().dispatch(request, *args, **kwargs)
+            self._tenant_token = set_current_tenant(request.user.id)
+
+class ReplicaReadMixin:
+    """
+    Mixin that serves safe (GET/HEAD/OPTIONS) requests from a read replica.
+    A user who has just written is pinned to the primary for REPLICA_PIN_SECONDS
+    so their next reads see the change.
+    """
+    def dispatch(self, request, *args, **kwargs):
+        self._replica_token = None
+        try:
+            response = super().dispatch(request, *args, **kwargs)
+        finally:
+            if self._replica_token is not None:
+                reset_replica_reads(self._replica_token)
+        user = getattr(request, 'user', None)
+        if request.method not in SAFE_METHODS and response.status_code < 400 and user and user.is_authenticated:
+            pin_to_primary(user.id)
+        return response
+
+    def initial(self, request, *args, **kwargs):
+        # Runs after authentication, so pinned users can be recognised
+        super().initial(request, *args, **kwargs)
+        if request.method in SAFE_METHODS:
+            user = request.user
+            if not (user and user.is_authenticated and is_pinned_to_primary(user.id)):
+                self._replica_token = set_replica_reads()
 
-class ExerciseViewSet(viewsets.ModelViewSet):
+class ExerciseViewSet(ReplicaReadMixin, viewsets.ModelViewSet):
     """
     ViewSet for Exercise CRUD operations
     GET    /api/exercises/          - List all exercises : list()
@@ -35,8 +84,9 @@ class ExerciseViewSet(viewsets.ModelViewSet):
     GET    /api/exercises/{id}/     - Retrieve specific exercise : retrieve()
     PUT    /api/exercises/{id}/     - Update exercise : update()
     DELETE /api/exercises/{id}/     - Delete exercise : destroy()
+    GET    /api/exercises/suggest/  - Ranked type-ahead matches : suggest()
     """
-    queryset = Exercise.objects.all()
+    queryset = Exercise.objects.select_related('muscle_group', 'exercise_type')
     filter_backends = [DjangoFilterBackend, SearchFilter]
     filterset_fields = ['muscle_group', 'exercise_type']
     search_fields = ['exercise_name']
@@ -56,11 +106,32 @@ class ExerciseViewSet(viewsets.ModelViewSet):
             ExerciseDetailSerializer(serializer.instance).data,
             status=status.HTTP_201_CREATED
         )
+    
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Top-k exercises matching ?q= across name, legacy name, type and muscle group.
+        Optional ?muscle_group= restricts matches, ?limit= caps results (max 50).
+        Served from an in-memory index, so it never scans the exercise table.
+        """
+        try:
+            limit = min(max(int(request.query_params.get('limit', 10)), 1), 50)
+            muscle_group = request.query_params.get('muscle_group')
+            muscle_group_id = int(muscle_group) if muscle_group else None
+        except ValueError:
+            return Response({'detail': 'limit and muscle_group must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        matches = get_index().search(
+            request.query_params.get('q', ''),
+            limit=limit,
+            muscle_group_id=muscle_group_id
+        )
+        return Response(matches)
 
-class SessionViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
+class SessionViewSet(ReplicaReadMixin, UserSchemaViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for Session CRUD operations with user schema context
-    GET    /api/sessions/          - List sessions for user (schema-filtered)
+    GET    /api/sessions/          - List sessions for user (schema-filtered, incl. archived)
     POST   /api/sessions/          - Create new session for user
     GET    /api/sessions/{id}/     - Retrieve specific session
     PUT    /api/sessions/{id}/     - Update session
@@ -69,6 +140,11 @@ class SessionViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['completed']
+    throttle_scope = 'sessions'
+
+    def get_throttle_cost(self, request):
+        """Lists are unpaginated: charge by how much history the date range covers"""
+        return date_range_cost(request.query_params) if self.action == 'list' else 1
     
     def get_serializer_class(self):
         """Use different serializers for different actions"""
@@ -77,43 +153,34 @@ class SessionViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
         return SessionDetailSerializer
     
     def list(self, request):
-        """List all sessions for authenticated user (schema-filtered)"""
-        queryset = Session.objects.filter(user=request.user).prefetch_related('sessionentry_set')
-        
-        # Apply custom filtering
-        if date_from := request.query_params.get('date_from'):
-            queryset = queryset.filter(date__gte=date_from)
-        if date_to := request.query_params.get('date_to'):
-            queryset = queryset.filter(date__lte=date_to)
-        if exercise_id := request.query_params.get('exercise_id'):
-            queryset = queryset.filter(sessionentry__exercise_id=exercise_id).distinct()
-        if muscle_group_id := request.query_params.get('muscle_group_id'):
-            queryset = queryset.filter(
-                sessionentry__exercise__muscle_group_id=muscle_group_id
-            ).distinct()
+        """List all sessions for authenticated user (schema-filtered), archived months included"""
+        queryset = session_list_queryset(request.user, request.query_params)
         
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        with time_section('serialize'):
+            data = archived_sessions(request.user, request.query_params) + serializer.data
+        return Response(data)
     
     def create(self, request):
         """Create new session for authenticated user"""
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save(user=request.user)
-        return Response(
-            SessionDetailSerializer(serializer.instance).data,
-            status=status.HTTP_201_CREATED
-        )
+        data = SessionDetailSerializer(serializer.instance).data
+        publish_event(request.user.id, 'session.created', data)
+        return Response(data, status=status.HTTP_201_CREATED)
     
     def retrieve(self, request, pk=None):
         """Retrieve specific session for authenticated user"""
         try:
-            session = Session.objects.get(id=pk, user=request.user)
+            session = session_detail_queryset(request.user).get(id=pk)
         except Session.DoesNotExist:
             return Response({'detail': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         
         serializer = self.get_serializer(session)
-        return Response(serializer.data)
+        with time_section('serialize'):
+            data = serializer.data
+        return Response(data)
     
     def update(self, request, pk=None):
         """Update session for authenticated user"""
@@ -125,7 +192,9 @@ class SessionViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(session, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response(SessionDetailSerializer(serializer.instance).data)
+        data = SessionDetailSerializer(serializer.instance).data
+        publish_event(request.user.id, 'session.updated', data)
+        return Response(data)
     
     def destroy(self, request, pk=None):
         """Delete session for authenticated user"""
@@ -135,9 +204,11 @@ class SessionViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
             return Response({'detail': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         
         session.delete()
+        invalidate_analytics(request.user.id)
+        publish_event(request.user.id, 'session.deleted', {'id': int(pk)})
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class SessionEntryViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
+class SessionEntryViewSet(ReplicaReadMixin, UserSchemaViewSetMixin, viewsets.ModelViewSet):
     """
     ViewSet for SessionEntry CRUD operations
     GET    /api/session-entries/          - List user's entries
@@ -149,6 +220,10 @@ class SessionEntryViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend]
     filterset_fields = ['session', 'exercise']
+    throttle_scope = 'sessions'
+
+    def get_throttle_cost(self, request):
+        return entry_list_cost(request.query_params) if self.action == 'list' else 1
     
     def get_serializer_class(self):
         """Use different serializers for different actions"""
@@ -158,20 +233,12 @@ class SessionEntryViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
     
     def list(self, request):
         """List session entries only for sessions belonging to user"""
-        queryset = SessionEntry.objects.filter(
-            session__user=request.user
-        ).select_related('exercise', 'session')
-        
-        # Apply session filtering if provided
-        if session_id := request.query_params.get('session'):
-            queryset = queryset.filter(session_id=session_id)
-        
-        # Apply exercise filtering if provided
-        if exercise_id := request.query_params.get('exercise'):
-            queryset = queryset.filter(exercise_id=exercise_id)
+        queryset = entry_list_queryset(request.user, request.query_params)
         
         serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        with time_section('serialize'):
+            data = serializer.data
+        return Response(data)
     
     def create(self, request):
         """Create new session entry (must belong to user's session, check for duplicates)"""
@@ -200,10 +267,9 @@ class SessionEntryViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         serializer.save()
-        return Response(
-            SessionEntryDetailSerializer(serializer.instance).data,
-            status=status.HTTP_201_CREATED
-        )
+        data = SessionEntryDetailSerializer(serializer.instance).data
+        publish_event(request.user.id, 'entry.created', {'session_id': session.id, 'entry': data})
+        return Response(data, status=status.HTTP_201_CREATED)
         
     def retrieve(self, request, pk=None):
         """Retrieve specific session entry (must belong to user's session)"""
@@ -213,7 +279,9 @@ class SessionEntryViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
             return Response({'detail': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         
         serializer = self.get_serializer(entry)
-        return Response(serializer.data)
+        with time_section('serialize'):
+            data = serializer.data
+        return Response(data)
     
     def update(self, request, pk=None):
         """Update session entry (must belong to user's session)"""
@@ -225,6 +293,10 @@ class SessionEntryViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
         serializer = self.get_serializer(entry, data=request.data, partial=True)
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        publish_event(request.user.id, 'entry.updated', {
+            'session_id': serializer.instance.session_id,
+            'entry': SessionEntryDetailSerializer(serializer.instance).data,
+        })
         return Response(serializer.data)
     
     def destroy(self, request, pk=None):
@@ -235,9 +307,11 @@ class SessionEntryViewSet(UserSchemaViewSetMixin, viewsets.ModelViewSet):
             return Response({'detail': 'Not found'}, status=status.HTTP_404_NOT_FOUND)
         
         entry.delete()
+        invalidate_analytics(request.user.id)
+        publish_event(request.user.id, 'entry.deleted', {'id': int(pk), 'session_id': entry.session_id})
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-class MuscleGroupViewSet(viewsets.ReadOnlyModelViewSet):
+class MuscleGroupViewSet(ReplicaReadMixin, viewsets.ReadOnlyModelViewSet):
     """
     ViewSet for MuscleGroup read operations
     GET    /api/muscle-groups/          - List all muscle groups with exercises
@@ -245,3 +319,116 @@ class MuscleGroupViewSet(viewsets.ReadOnlyModelViewSet):
     """
     queryset = MuscleGroup.objects.all().prefetch_related('exercise_set')
     serializer_class = MuscleGroupSerializer
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    ViewSet for submitting and polling background jobs (run by `manage.py run_workers`)
+    GET    /api/jobs/                - List the user's jobs, newest first
+    POST   /api/jobs/                - Submit a job: kind=export_sessions, or kind=import_sessions with a CSV file
+    GET    /api/jobs/{id}/           - Poll status and progress
+    GET    /api/jobs/{id}/download/  - Download the file produced by a finished export (or an import's unmatched names)
+    """
+    permission_classes = [IsAuthenticated]
+    serializer_class = JobSerializer
+    throttle_scope = 'jobs'
+
+    def get_throttle_cost(self, request):
+        return JOB_COST if self.action == 'create' else 1
+
+    def get_queryset(self):
+        return Job.objects.filter(user=self.request.user).order_by('-created_at')
+
+    def create(self, request):
+        """Queue a job for the authenticated user"""
+        serializer = JobCreateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        kind = serializer.validated_data['kind']
+
+        if kind == 'import_sessions':
+            # Save the upload where the workers can read it. The job is only
+            # visible to workers once this transaction commits, after the file is written
+            with transaction.atomic():
+                job = enqueue(kind, user=request.user)
+                path = job_file_path(job, '_upload.csv')
+                with open(path, 'wb') as f:
+                    for chunk in serializer.validated_data['file'].chunks():
+                        f.write(chunk)
+                job.payload = {'session_csv': path}
+                job.save(update_fields=['payload'])
+        else:
+            job = enqueue(kind, user=request.user)
+
+        return Response(JobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Stream an export's CSV, or an import's unmatched exercise names, once the job has succeeded"""
+        job = self.get_object()
+        path = (job.result or {}).get('file')
+        if job.status != Job.SUCCEEDED or not path or not os.path.exists(path):
+            return Response({'detail': 'No file available for this job'}, status=status.HTTP_404_NOT_FOUND)
+        prefix = 'unmatched_exercises' if job.kind == 'import_sessions' else 'sessions'
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=f'{prefix}_{job.id}.csv')
+
+
+class AnalyticsView(UserSchemaViewSetMixin, APIView):
+    """
+    Strength analytics over the user's whole history (see base/utils/analytics.py).
+    Computed on the primary: the result is cached under the current data version
+    for a day, so it must not be built from a lagging replica.
+    GET    /api/analytics/          - Estimated 1RM, trend and plateau status per exercise,
+                                      and sessions per week per muscle group
+    Optional ?exercise_id=1,2 restricts exercises, ?window= sets the trend window
+    (points, default 6), ?weeks= the frequency window (default 12), ?series=1
+    includes each exercise's estimated 1RM series.
+    """
+    permission_classes = [IsAuthenticated]
+    throttle_scope = 'analytics'
+    throttle_cost = 5
+
+    def get(self, request):
+        params = request.query_params
+        try:
+            exercise_ids = sorted({int(i) for i in params['exercise_id'].split(',') if i}) if params.get('exercise_id') else None
+            window = min(max(int(params.get('window', 6)), 2), 52)
+            weeks = min(max(int(params.get('weeks', 12)), 1), 520)
+        except ValueError:
+            return Response({'detail': 'exercise_id, window and weeks must be integers'}, status=status.HTTP_400_BAD_REQUEST)
+
+        data = get_analytics(
+            request.user,
+            exercise_ids=exercise_ids,
+            window=window,
+            weeks=weeks,
+            include_series=params.get('series') in ('1', 'true'),
+        )
+        return Response(data)
+
+
+class IsStaffOrMetricsScraper(BasePermission):
+    """
+    Allow staff users, or unauthenticated scrapers sending settings.METRICS_SCRAPE_TOKEN
+    in X-Metrics-Token (or connecting from settings.METRICS_ALLOWED_IPS)
+    """
+    def has_permission(self, request, view):
+        if request.user and request.user.is_staff:
+            return True
+        token = getattr(settings, 'METRICS_SCRAPE_TOKEN', '')
+        sent = request.META.get('HTTP_X_METRICS_TOKEN', '')
+        if token and sent and hmac.compare_digest(sent.encode(), token.encode()):
+            return True
+        return request.META.get('REMOTE_ADDR') in getattr(settings, 'METRICS_ALLOWED_IPS', [])
+
+class MetricsView(APIView):
+    """
+    Prometheus text endpoint for the per-endpoint request histograms
+    GET    /api/_metrics            - Metrics recorded by this worker process
+    """
+    permission_classes = [IsStaffOrMetricsScraper]
+    
+    def get(self, request):
+        return HttpResponse(
+            registry.render_prometheus(),
+            content_type='text/plain; version=0.0.4; charset=utf-8'
+        )
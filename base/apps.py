@@ -16,4 +16,12 @@ class BaseConfig(AppConfig):
         
         # Add activate method to User model
         User.activate = activate
+        
+        # Connect signal handlers
+        import base.signals  # noqa: F401
+
+        # Warn when replica pins would be kept per process
+        from django.core import checks
+        from base.db_routers import check_replica_pin_cache
+        checks.register(check_replica_pin_cache, checks.Tags.caches)
 
@@ -0,0 +1,99 @@
+"""
+Database routing for read replicas.
+
+Reads only go to a replica inside replica_reads() (ReplicaReadMixin enters it
+for safe requests); everything else, including all writes and migrations,
+uses 'default'. Replica aliases are the DATABASES entries named replica_*,
+configured from DB_REPLICA_HOSTS in settings.
+
+Tenant binding needs nothing extra: install_tenant_binding attaches to every
+new connection, whichever alias it belongs to.
+"""
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+_read_from_replica = ContextVar('read_from_replica', default=False)
+
+PIN_KEY = 'replica-pin:{user_id}'
+
+
+def replica_aliases():
+    return [alias for alias in settings.DATABASES if alias.startswith('replica_')]
+
+
+def set_replica_reads(enabled=True):
+    """Route ORM reads to a replica (if any are configured); returns a token for reset_replica_reads()"""
+    return _read_from_replica.set(enabled)
+
+
+def reset_replica_reads(token):
+    _read_from_replica.reset(token)
+
+
+@contextmanager
+def replica_reads():
+    """Send ORM reads made in this context to a replica (if any are configured)"""
+    token = set_replica_reads()
+    try:
+        yield
+    finally:
+        reset_replica_reads(token)
+
+
+def pin_to_primary(user_id):
+    """
+    Keep a user's reads on the primary for REPLICA_PIN_SECONDS after they write,
+    so they see their own changes despite replication lag. The pin lives in the
+    default cache, which every process shares (see CACHES); the router never
+    sends its reads to a replica.
+    """
+    cache.set(PIN_KEY.format(user_id=user_id), True, timeout=settings.REPLICA_PIN_SECONDS)
+
+
+def is_pinned_to_primary(user_id):
+    return bool(cache.get(PIN_KEY.format(user_id=user_id)))
+
+
+# A pin only this process can see leaves every other process reading stale data
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def check_replica_pin_cache(app_configs, **kwargs):
+    """System check: replicas need a default cache shared between processes for their pins"""
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if replica_aliases() and backend in PROCESS_LOCAL_CACHES:
+        return [checks.Warning(
+            f"Read replicas are configured but the default cache ({backend}) is per process, "
+            f"so read-your-writes pins won't reach other processes.",
+            hint="Use the DatabaseCache or RedisCache configured in settings.CACHES.",
+            id='base.W001',
+        )]
+    return []
+
+
+class ReplicaRouter:
+    def __init__(self):
+        self.replicas = replica_aliases()
+
+    def db_for_read(self, model, **hints):
+        # DatabaseCache entries (versions, pins, throttles) must never be read stale
+        if self.replicas and _read_from_replica.get() and model._meta.app_label != 'django_cache':
+            return random.choice(self.replicas)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
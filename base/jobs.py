@@ -0,0 +1,192 @@
+"""
+PostgreSQL-backed background jobs.
+
+Jobs are rows in base_job. Workers (`manage.py run_workers`) claim them with
+SELECT ... FOR UPDATE SKIP LOCKED, so any number of worker processes can poll
+the same table without handing the same job out twice. Failed jobs are retried
+with exponential backoff until max_attempts is reached.
+
+Handlers are registered per kind with @job_handler and are called with
+(job, progress), where progress(done, total) records how far the job has got.
+Whatever a handler returns is stored as the job's (JSON) result.
+
+Progress doubles as the worker's heartbeat. It is written on a connection of
+its own, so it stays visible while the handler is inside a long transaction.
+Every status update is conditional on the job still being locked by the run
+that makes it, so a run whose job was requeued as stale can't overwrite the
+newer run's state.
+"""
+import logging
+import os
+import traceback
+from datetime import timedelta
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+from base.models import Job
+
+logger = logging.getLogger(__name__)
+
+HANDLERS = {}
+
+# Retry delay is RETRY_BASE_SECONDS * 2 ** (attempts - 1), capped at RETRY_MAX_SECONDS
+RETRY_BASE_SECONDS = 10
+RETRY_MAX_SECONDS = 600
+
+
+def job_handler(kind):
+    """Register the decorated function as the handler for jobs of this kind"""
+    def register(func):
+        HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, user=None, payload=None, max_attempts=3):
+    """Queue a job; it runs once a worker picks it up"""
+    if kind not in HANDLERS:
+        raise ValueError(f"Unknown job kind {kind!r}")
+    return Job.objects.create(kind=kind, user=user, payload=payload or {}, max_attempts=max_attempts)
+
+
+def claim_job(worker_id):
+    """Lock and mark running the oldest due job, or return None if there is none"""
+    with transaction.atomic():
+        job = (
+            Job.objects
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.QUEUED, run_after__lte=timezone.now())
+            .order_by('run_after', 'id')
+            .first()
+        )
+        if job is None:
+            return None
+        job.status = Job.RUNNING
+        job.attempts += 1
+        job.locked_by = worker_id
+        job.locked_at = timezone.now()
+        job.save(update_fields=['status', 'attempts', 'locked_by', 'locked_at'])
+    return job
+
+
+class JobLost(Exception):
+    """The job was requeued (as stale) while this run was still working on it"""
+
+
+def run_job(job):
+    """Run a claimed job's handler and record the outcome"""
+    # Not the thread's 'default' connection: the handler may hold that one in a
+    # transaction for the whole run, which would hide the heartbeat until it commits
+    status_connection = connections.create_connection('default')
+
+    def progress(done, total):
+        with status_connection.cursor() as cursor:
+            cursor.execute(
+                f"UPDATE {Job._meta.db_table} SET progress_done = %s, progress_total = %s, locked_at = %s "
+                f"WHERE id = %s AND locked_by = %s;",
+                [done, total, timezone.now(), job.id, job.locked_by],
+            )
+            if cursor.rowcount == 0:
+                # Abort (rolling back the handler's transaction) rather than run twice
+                raise JobLost(f"Job {job.id} is no longer locked by {job.locked_by}")
+
+    try:
+        result = HANDLERS[job.kind](job, progress)
+    except Exception:
+        _fail(job, traceback.format_exc())
+        return False
+    finally:
+        status_connection.close()
+
+    Job.objects.filter(id=job.id, locked_by=job.locked_by).update(
+        status=Job.SUCCEEDED, result=result, error='', finished_at=timezone.now(),
+        locked_by='', locked_at=None,
+    )
+    return True
+
+
+def _fail(job, error):
+    """Requeue with backoff, or mark failed once out of attempts (unless another run owns the job now)"""
+    owned = Job.objects.filter(id=job.id, locked_by=job.locked_by)
+    if job.attempts < job.max_attempts:
+        delay = min(RETRY_BASE_SECONDS * 2 ** (job.attempts - 1), RETRY_MAX_SECONDS)
+        owned.update(
+            status=Job.QUEUED, error=error, run_after=timezone.now() + timedelta(seconds=delay),
+            locked_by='', locked_at=None,
+        )
+    else:
+        owned.update(
+            status=Job.FAILED, error=error, finished_at=timezone.now(), locked_by='', locked_at=None,
+        )
+
+
+def requeue_stale_jobs(stale_after):
+    """
+    Requeue running jobs whose worker has not reported for stale_after seconds
+    (e.g. it was killed). The lost run counts as an attempt.
+    """
+    cutoff = timezone.now() - timedelta(seconds=stale_after)
+    stale = 0
+    with transaction.atomic():
+        for job in Job.objects.select_for_update(skip_locked=True).filter(status=Job.RUNNING, locked_at__lt=cutoff):
+            _fail(job, f"Worker {job.locked_by} stopped reporting")
+            stale += 1
+    return stale
+
+
+def job_file_path(job, suffix):
+    """Where a job writes its output file"""
+    directory = getattr(settings, 'JOB_FILES_DIR', settings.BASE_DIR / 'job_files')
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f"job_{job.id}{suffix}")
+
+
+# ===== Handlers =====
+
+@job_handler('provision_tenant')
+def provision_tenant_job(job, progress):
+    from base.utils.tenancy import provision_tenant
+    provision_tenant(job.user_id)
+    progress(1, 1)
+    return {'user_id': job.user_id}
+
+
+@job_handler('import_sessions')
+def import_sessions_job(job, progress):
+    """
+    payload: session_csv (path on the worker's filesystem), optional exercise_csv.
+    Names that could not be matched to the exercise list are written to a review file.
+    """
+    from base.utils.session_transfer import LEGACY_EXERCISES_CSV, import_sessions, load_legacy_sessions
+    review_path = job_file_path(job, '_unmatched.csv')
+    combined_data = load_legacy_sessions(
+        job.payload['session_csv'], job.payload.get('exercise_csv', LEGACY_EXERCISES_CSV), review_path=review_path
+    )
+    sessions_created, entries_created, rows_skipped = import_sessions(job.user, combined_data, progress=progress)
+    result = {'sessions_created': sessions_created, 'entries_created': entries_created, 'rows_skipped': rows_skipped}
+    if rows_skipped:
+        result['file'] = review_path
+    return result
+
+
+@job_handler('export_sessions')
+def export_sessions_job(job, progress):
+    from base.utils.session_transfer import export_sessions
+    path = job_file_path(job, '.csv')
+    rows = export_sessions(job.user, path, progress=progress)
+    return {'rows': rows, 'file': path}
+
+
+def work(worker_id, stop, poll_interval=1.0, stale_after=300):
+    """
+    Worker loop: claim and run jobs until stop (a threading/multiprocessing
+    Event) is set, sleeping poll_interval seconds whenever the queue is empty.
+    """
+    while not stop.is_set():
+        requeue_stale_jobs(stale_after)
+        job = claim_job(worker_id)
+        if job is None:
+            stop.wait(poll_interval)
+            continue
+        ok = run_job(job)
+        logger.info("[%s] job %s %s attempt %s: %s", worker_id, job.id, job.kind, job.attempts, 'ok' if ok else 'failed')
@@ -0,0 +1,40 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from base.utils.archive import archive_cutoff, archive_user_history
+from base.utils.tenancy import tenant_user_ids
+
+
+class Command(BaseCommand):
+    """
+    Compact each tenant's sessions older than the horizon into per-month
+    SessionArchive rows (see base/utils/archive.py). Incremental and safe to
+    run on a schedule: months with no hot sessions left are skipped.
+    """
+    help = 'Archive whole months of training history older than the horizon'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int, default=settings.ARCHIVE_HORIZON_DAYS,
+                            help='Keep at least this many days of history in the hot tables')
+        parser.add_argument('--email', type=str, help='Only archive this user')
+
+    def handle(self, *args, **options):
+        if options['email']:
+            users = User.objects.filter(email=options['email'])
+        else:
+            users = User.objects.filter(id__in=tenant_user_ids()).order_by('id')
+
+        cutoff = archive_cutoff(options['horizon_days'])
+        self.stdout.write(f'Archiving history before {cutoff}')
+        total_months = total_sessions = total_entries = 0
+        for user in users:
+            months, sessions, entries = archive_user_history(user, options['horizon_days'])
+            if months:
+                self.stdout.write(f'{user.email}: {months} months, {sessions} sessions, {entries} entries')
+            total_months += months
+            total_sessions += sessions
+            total_entries += entries
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Archived {total_months} months ({total_sessions} sessions, {total_entries} entries)'
+        ))
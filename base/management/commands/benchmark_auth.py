@@ -0,0 +1,96 @@
+import uuid
+from django.core.management.base import BaseCommand
+from django.contrib.auth.models import User
+from django.test import Client, override_settings
+from base.utils.benchmark import percentile, timed_request
+from base.utils.tenancy import drop_tenant
+
+
+class Command(BaseCommand):
+    """
+    Load benchmark for /api/auth/register/ and /api/auth/login/
+
+    Every user registered here shares the same email local part, so username
+    allocation is exercised against a growing set of colliding names.
+    """
+    help = 'Benchmark the register and login endpoints through the Django test client'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Number of registrations (and subsequent logins) to perform'
+        )
+        parser.add_argument(
+            '--prefix',
+            type=str,
+            default='john',
+            help='Email local part shared by every benchmark user'
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the benchmark users and their schemas afterwards'
+        )
+
+    # Measure the endpoints themselves, not the rate limits in front of them
+    @override_settings(THROTTLING_ENABLED=False)
+    def handle(self, *args, **options):
+        n_requests = options['requests']
+        prefix = options['prefix']
+        run_id = uuid.uuid4().hex[:8]
+        password = 'bench-password-123'
+        client = Client(HTTP_HOST='localhost')
+
+        emails = [f"{prefix}@bench-{run_id}-{i}.example.com" for i in range(n_requests)]
+        results = {'register': [], 'login': []}
+
+        try:
+            for email in emails:
+                results['register'].append(self._timed_post(client, '/api/auth/register/', {
+                    'email': email, 'password': password, 'password2': password,
+                }, expected_status=201))
+
+            for email in emails:
+                results['login'].append(self._timed_post(client, '/api/auth/login/', {
+                    'email': email, 'password': password,
+                }, expected_status=200))
+        finally:
+            if not options['keep']:
+                self._cleanup(emails)
+
+        for endpoint, samples in results.items():
+            self._report(endpoint, samples)
+
+    def _timed_post(self, client, url, payload, expected_status):
+        response, elapsed_ms, query_count = timed_request(
+            client, 'post', url, data=payload, content_type='application/json'
+        )
+        if response.status_code != expected_status:
+            self.stdout.write(
+                self.style.WARNING(f'{url} returned {response.status_code}: {response.content[:200]!r}')
+            )
+        return elapsed_ms, query_count
+
+    def _report(self, endpoint, samples):
+        if not samples:
+            return
+        latencies = sorted(elapsed for elapsed, _ in samples)
+        query_counts = [count for _, count in samples]
+        total_s = sum(latencies) / 1000
+        self.stdout.write(self.style.SUCCESS(
+            f'{endpoint:<10} n={len(samples)} '
+            f'p50={percentile(latencies, 50):.1f}ms '
+            f'p95={percentile(latencies, 95):.1f}ms '
+            f'p99={percentile(latencies, 99):.1f}ms '
+            f'queries/req={sum(query_counts) / len(query_counts):.1f} (max {max(query_counts)}) '
+            f'throughput={len(samples) / total_s:.1f} req/s'
+        ))
+
+    def _cleanup(self, emails):
+        """Drop the benchmark users and their tenant data"""
+        user_ids = list(User.objects.filter(email__in=emails).values_list('id', flat=True))
+        for user_id in user_ids:
+            drop_tenant(user_id)
+        User.objects.filter(id__in=user_ids).delete()
@@ -0,0 +1,139 @@
+import json
+from datetime import date, timedelta
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+from base.models import Session, SessionEntry
+from base.utils.benchmark import find_regressions, summarize, timed_request
+from base.utils.synthetic_data import BENCH_PASSWORD, bench_username, ensure_bench_tenant
+from base.utils.user_context import user_schema_context
+
+
+class Command(BaseCommand):
+    """
+    Endpoint latency benchmarks against the real URL routes.
+
+    For every data size (years of history) a dedicated bench_<size>y tenant is
+    seeded once and reused. Each scenario is requested repeatedly through the
+    Django test client and summarized as p50/p95/p99 latency, query count and
+    payload size. Results can be stored as a JSON baseline; later runs fail
+    when an endpoint regresses beyond --threshold.
+    """
+    help = 'Benchmark API endpoints at several data sizes and compare with a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            type=str,
+            default='0.25,1,5',
+            help='Comma separated years of history per benchmark tenant'
+        )
+        parser.add_argument('--iterations', type=int, default=30, help='Timed requests per scenario')
+        parser.add_argument('--warmup', type=int, default=3, help='Untimed requests per scenario')
+        parser.add_argument(
+            '--baseline',
+            type=str,
+            default='benchmarks/baseline.json',
+            help='Baseline JSON file to compare against (or write with --save-baseline)'
+        )
+        parser.add_argument('--save-baseline', action='store_true', help='Write results as the new baseline')
+        parser.add_argument(
+            '--threshold',
+            type=float,
+            default=0.25,
+            help='Allowed relative p95 increase before an endpoint counts as regressed'
+        )
+        parser.add_argument(
+            '--min-delta-ms',
+            type=float,
+            default=2.0,
+            help='Ignore p95 increases smaller than this (noise floor)'
+        )
+        parser.add_argument('--output', type=str, help='Also write the raw results to this JSON file')
+
+    # Measure the endpoints themselves, not the rate limits in front of them
+    @override_settings(THROTTLING_ENABLED=False)
+    def handle(self, *args, **options):
+        sizes = [float(size) for size in options['sizes'].split(',')]
+        results = {}
+
+        for years in sizes:
+            self.stdout.write(f'Preparing {bench_username(years)}...')
+            user = ensure_bench_tenant(years)
+
+            client = Client(HTTP_HOST='localhost')
+            auth = {'HTTP_AUTHORIZATION': f'Bearer {RefreshToken.for_user(user).access_token}'}
+            for name, method, url, kwargs in self._scenarios(user):
+                stats = self._run_scenario(client, method, url, {**auth, **kwargs}, options)
+                key = f'{bench_username(years)}:{name}'
+                results[key] = stats
+                self.stdout.write(
+                    f"{key:<40} p50={stats['p50_ms']:>8.2f}ms p95={stats['p95_ms']:>8.2f}ms "
+                    f"p99={stats['p99_ms']:>8.2f}ms queries={stats['queries']:>3} "
+                    f"payload={stats['payload_bytes']:>9}B"
+                )
+
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2, sort_keys=True))
+
+        baseline_path = Path(options['baseline'])
+        if options['save_baseline']:
+            baseline_path.parent.mkdir(parents=True, exist_ok=True)
+            baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True))
+            self.stdout.write(self.style.SUCCESS(f'Baseline written to {baseline_path}'))
+            return
+
+        if not baseline_path.exists():
+            self.stdout.write(self.style.WARNING(f'No baseline at {baseline_path}, skipping comparison'))
+            return
+
+        baseline = json.loads(baseline_path.read_text())
+        regressions = find_regressions(results, baseline, options['threshold'], options['min_delta_ms'])
+        if regressions:
+            raise CommandError('Performance regressions:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS(f'No regressions against {baseline_path}'))
+
+    def _scenarios(self, user):
+        """(name, method, url, extra client kwargs) for every benchmarked route"""
+        with user_schema_context(user):
+            session = Session.objects.filter(user=user).order_by('-date').first()
+            entry = SessionEntry.objects.select_related('exercise').filter(session=session).first()
+        session_id = session.id if session else 0
+        exercise_id = entry.exercise_id if entry else 0
+        muscle_group_id = entry.exercise.muscle_group_id if entry else 0
+        today = date.today()
+        month_ago = (today - timedelta(days=30)).isoformat()
+        year_ago = (today - timedelta(days=365)).isoformat()
+
+        return [
+            ('sessions-all', 'get', '/api/sessions/', {}),
+            ('sessions-month', 'get', f'/api/sessions/?date_from={month_ago}&date_to={today}', {}),
+            ('sessions-year', 'get', f'/api/sessions/?date_from={year_ago}&date_to={today}', {}),
+            ('sessions-exercise', 'get', f'/api/sessions/?exercise_id={exercise_id}', {}),
+            ('sessions-muscle-group', 'get', f'/api/sessions/?muscle_group_id={muscle_group_id}', {}),
+            ('session-detail', 'get', f'/api/sessions/{session_id}/', {}),
+            ('session-entries-all', 'get', '/api/session-entries/', {}),
+            ('session-entries-session', 'get', f'/api/session-entries/?session={session_id}', {}),
+            ('exercises', 'get', '/api/exercises/', {}),
+            ('muscle-groups', 'get', '/api/muscle-groups/', {}),
+            ('auth-me', 'get', '/api/auth/me/', {}),
+            ('auth-login', 'post', '/api/auth/login/', {
+                'data': {'email': user.email, 'password': BENCH_PASSWORD},
+                'content_type': 'application/json',
+            }),
+        ]
+
+    def _run_scenario(self, client, method, url, kwargs, options):
+        for _ in range(options['warmup']):
+            timed_request(client, method, url, **kwargs)
+
+        latencies, query_counts, payload_sizes = [], [], []
+        for _ in range(options['iterations']):
+            response, elapsed_ms, query_count = timed_request(client, method, url, **kwargs)
+            if response.status_code >= 400:
+                raise CommandError(f'{method.upper()} {url} returned {response.status_code}')
+            latencies.append(elapsed_ms)
+            query_counts.append(query_count)
+            payload_sizes.append(len(response.content))
+        return summarize(latencies, query_counts, payload_sizes)
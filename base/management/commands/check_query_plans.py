@@ -0,0 +1,83 @@
+import json
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from base.models import SessionEntry
+from base.utils.synthetic_data import bench_username, ensure_bench_tenant
+from api.querysets import session_list_queryset, entry_list_queryset
+from base.utils.user_context import user_schema_context
+
+# Plan nodes that mean a de-duplication or sort pass over the filtered rows
+SORT_NODES = {'Sort', 'Incremental Sort', 'Unique', 'HashAggregate', 'GroupAggregate'}
+
+
+class Command(BaseCommand):
+    """
+    EXPLAIN regression checks for the hot session filters on seeded data.
+
+    Captures the plan of each filter query for a bench_<N>y tenant (seeded on
+    first use) and fails if it contains a sequential scan of a table that the
+    filter should reach through an index, or a sort/de-duplication node.
+    The project has no test suite, so this command is the plan regression
+    check: run it in CI or after changing the filters or tenant indexes.
+    """
+    help = 'Check the query plans of the session filters for seq scans and sorts'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--years', type=float, default=5, help='Years of history in the checked tenant (tables of a few pages are '
+                                 'seq scanned whatever the indexes, so keep this realistic)')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only failures')
+
+    def handle(self, *args, **options):
+        user = ensure_bench_tenant(options['years'])
+        self.stdout.write(f"Checking plans for {bench_username(options['years'])}")
+
+        with user_schema_context(user):
+            # Fresh statistics so the plans reflect the seeded data
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE base_session; ANALYZE base_sessionentry;")
+
+            entry = SessionEntry.objects.select_related('exercise').filter(session__user=user).last()
+            if entry is None:
+                raise CommandError('Benchmark tenant has no entries')
+            month_ago = (date.today() - timedelta(days=30)).isoformat()
+
+            checks = [
+                # (name, queryset, tables that must not be sequentially scanned)
+                ('sessions by exercise',
+                 session_list_queryset(user, {'exercise_id': entry.exercise_id}),
+                 {'base_sessionentry'}),
+                ('sessions by muscle group',
+                 session_list_queryset(user, {'muscle_group_id': entry.exercise.muscle_group_id}),
+                 {'base_sessionentry'}),
+                ('sessions in last month',
+                 session_list_queryset(user, {'date_from': month_ago}),
+                 {'base_session'}),
+                ('entries of a session',
+                 entry_list_queryset(user, {'session': entry.session_id}),
+                 {'base_sessionentry'}),
+            ]
+
+            failures = []
+            for name, queryset, no_seq_scan in checks:
+                plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+                problems = list(self._problems(plan, no_seq_scan))
+                if problems or options['verbose_plans']:
+                    self.stdout.write(f'\n{name}:\n{queryset.explain()}')
+                if problems:
+                    failures.append(f"{name}: {', '.join(problems)}")
+                    self.stdout.write(self.style.ERROR(f'  FAIL {name}: {", ".join(problems)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'  ok   {name}'))
+
+        if failures:
+            raise CommandError('Query plan regressions:\n  ' + '\n  '.join(failures))
+
+    def _problems(self, node, no_seq_scan):
+        node_type = node['Node Type']
+        if node_type == 'Seq Scan' and node.get('Relation Name') in no_seq_scan:
+            yield f"seq scan on {node['Relation Name']}"
+        if node_type in SORT_NODES:
+            yield node_type.lower()
+        for child in node.get('Plans', []):
+            yield from self._problems(child, no_seq_scan)
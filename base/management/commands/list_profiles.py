@@ -0,0 +1,81 @@
+import json
+import pstats
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from base.utils.profiling import list_captures, profiling_dir
+
+
+class Command(BaseCommand):
+    """
+    List and summarize request profiles captured by RequestProfilingMiddleware
+    """
+    help = 'List recent request profiles and summarize them by endpoint and hot function'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=20,
+            help='Number of most recent captures to consider'
+        )
+        parser.add_argument(
+            '--endpoint',
+            type=str,
+            help='Only include captures for this endpoint (view name, e.g. session-list)'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=15,
+            help='Number of hot functions to show'
+        )
+
+    def handle(self, *args, **options):
+        captures = []
+        for meta_path in list_captures():
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if options['endpoint'] and meta['endpoint'] != options['endpoint']:
+                continue
+            captures.append((meta_path, meta))
+            if len(captures) >= options['limit']:
+                break
+
+        if not captures:
+            self.stdout.write(self.style.WARNING(f'No captures found in {profiling_dir()}'))
+            return
+
+        self.stdout.write(self.style.SUCCESS('Recent captures'))
+        for meta_path, meta in captures:
+            self.stdout.write(
+                f"  {meta['captured_at']}  {meta['method']:<6} {meta['endpoint']:<24} "
+                f"{meta['duration_ms']:>9.1f}ms  {meta['query_count']:>4} queries  "
+                f"status={meta['status']}  user={meta['user_id']}  {meta_path.name}"
+            )
+
+        by_endpoint = defaultdict(list)
+        for _, meta in captures:
+            by_endpoint[(meta['method'], meta['endpoint'])].append(meta)
+        self.stdout.write(self.style.SUCCESS('\nBy endpoint'))
+        for (method, endpoint), metas in sorted(by_endpoint.items()):
+            durations = [m['duration_ms'] for m in metas]
+            sql_ms = [sum(q['duration_ms'] for q in m['sql']) for m in metas]
+            self.stdout.write(
+                f"  {method:<6} {endpoint:<24} n={len(metas):<4} "
+                f"mean={sum(durations) / len(durations):.1f}ms max={max(durations):.1f}ms "
+                f"sql_mean={sum(sql_ms) / len(sql_ms):.1f}ms "
+                f"queries_mean={sum(m['query_count'] for m in metas) / len(metas):.1f}"
+            )
+
+        # Merge every selected profile and rank functions by their own (self) time
+        profile_paths = [str(p.with_suffix('.prof')) for p, _ in captures if p.with_suffix('.prof').exists()]
+        if not profile_paths:
+            return
+        stats = pstats.Stats(*profile_paths)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:options['top']]
+        self.stdout.write(self.style.SUCCESS(f'\nHot functions across {len(profile_paths)} profiles (self time)'))
+        for (filename, line, func), (_, ncalls, tottime, cumtime, _) in rows:
+            self.stdout.write(
+                f"  {tottime * 1000:>9.1f}ms self  {cumtime * 1000:>9.1f}ms cum  {ncalls:>8} calls  "
+                f"{func} ({filename}:{line})"
+            )
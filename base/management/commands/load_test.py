@@ -0,0 +1,95 @@
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+from django.core.management.base import BaseCommand, CommandError
+from base.utils.benchmark import percentile
+
+
+class Command(BaseCommand):
+    """
+    Closed-loop HTTP load test against a running server.
+
+    Each simulated user keeps one keep-alive connection and issues requests back
+    to back. Run it against the WSGI deployment and the ASGI one (e.g.
+    /api/sessions/ vs /api/async/sessions/) with the same worker count to compare
+    how many concurrent users a worker sustains.
+    """
+    help = 'Drive a running server with N concurrent users and report throughput and latency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', type=str, default='http://localhost:8000', help='Server base URL')
+        parser.add_argument('--path', type=str, default='/api/async/sessions/', help='Path to request')
+        parser.add_argument('--email', type=str, required=True, help='Login email used to obtain a JWT')
+        parser.add_argument('--password', type=str, required=True, help='Login password')
+        parser.add_argument(
+            '--concurrency',
+            type=str,
+            default='1,10,50,100',
+            help='Comma separated numbers of concurrent users to test'
+        )
+        parser.add_argument('--duration', type=float, default=10.0, help='Seconds per concurrency level')
+
+    def handle(self, *args, **options):
+        target = urlsplit(options['url'])
+        token = self._login(target, options['email'], options['password'])
+        headers = {'Authorization': f'Bearer {token}'}
+
+        for concurrency in (int(c) for c in options['concurrency'].split(',')):
+            latencies, errors = self._run_level(target, options['path'], headers, concurrency, options['duration'])
+            latencies.sort()
+            self.stdout.write(
+                f"users={concurrency:<5} req/s={len(latencies) / options['duration']:>8.1f} "
+                f"p50={percentile(latencies, 50):>8.1f}ms p95={percentile(latencies, 95):>8.1f}ms "
+                f"p99={percentile(latencies, 99):>8.1f}ms errors={errors}"
+            )
+
+    def _login(self, target, email, password):
+        conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=30)
+        conn.request(
+            'POST', '/api/auth/login/',
+            body=json.dumps({'email': email, 'password': password}),
+            headers={'Content-Type': 'application/json'},
+        )
+        response = conn.getresponse()
+        body = response.read()
+        if response.status != 200:
+            raise CommandError(f'Login failed ({response.status}): {body[:200]!r}')
+        return json.loads(body)['access']
+
+    def _run_level(self, target, path, headers, concurrency, duration):
+        latencies = []
+        errors = [0]
+        lock = threading.Lock()
+        deadline = time.perf_counter() + duration
+
+        def user():
+            conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+            local_latencies = []
+            local_errors = 0
+            while time.perf_counter() < deadline:
+                start = time.perf_counter()
+                try:
+                    conn.request('GET', path, headers=headers)
+                    response = conn.getresponse()
+                    response.read()
+                    if response.status >= 400:
+                        local_errors += 1
+                    else:
+                        local_latencies.append((time.perf_counter() - start) * 1000)
+                except (OSError, http.client.HTTPException):
+                    local_errors += 1
+                    conn.close()
+                    conn = http.client.HTTPConnection(target.hostname, target.port or 80, timeout=60)
+            conn.close()
+            with lock:
+                latencies.extend(local_latencies)
+                errors[0] += local_errors
+
+        threads = [threading.Thread(target=user) for _ in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return latencies, errors[0]
@@ -0,0 +1,50 @@
+import time
+from django.core.management.base import BaseCommand
+from base.utils.maintenance import find_maintenance_tasks, run_maintenance
+
+
+class Command(BaseCommand):
+    """
+    ANALYZE/VACUUM the tenant tables whose statistics are missing or stale, or
+    which carry many dead rows (see base/utils/maintenance.py). Meant to run on
+    a schedule; tables that need nothing are skipped. Run it as the role that
+    owns the tenant tables (PostgreSQL skips tables it may not maintain).
+    """
+    help = 'Run targeted ANALYZE/VACUUM across tenant tables with a bounded pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Maximum concurrent connections')
+        parser.add_argument('--min-changes', type=int, default=50,
+                            help='Ignore tables with fewer modified/dead rows than this')
+        parser.add_argument('--change-ratio', type=float, default=0.1,
+                            help='ANALYZE when modified rows exceed this fraction of live rows')
+        parser.add_argument('--dead-ratio', type=float, default=0.2,
+                            help='VACUUM when dead rows exceed this fraction of live rows')
+        parser.add_argument('--schema', action='append', help='Only these schemas (repeatable)')
+        parser.add_argument('--dry-run', action='store_true', help='List the work without running it')
+
+    def handle(self, *args, **options):
+        tasks = find_maintenance_tasks(
+            min_changes=options['min_changes'],
+            change_ratio=options['change_ratio'],
+            dead_ratio=options['dead_ratio'],
+            schemas=options['schema'],
+        )
+        if options['verbosity'] > 1 or options['dry_run']:
+            for task in tasks:
+                self.stdout.write(f'{task.action:<17} {task.qualified_name:<45} {task.reason}')
+        if options['dry_run']:
+            self.stdout.write(f'{len(tasks)} tables need maintenance')
+            return
+
+        start = time.perf_counter()
+        done, failed = run_maintenance(tasks, workers=options['workers'])
+        vacuumed = sum(1 for task in done if task.action.startswith('VACUUM'))
+        self.stdout.write(self.style.SUCCESS(
+            f'Maintained {len(done)} tables ({vacuumed} vacuumed, {len(done) - vacuumed} analyzed) '
+            f'in {time.perf_counter() - start:.1f}s'
+        ))
+        if failed:
+            for task in failed:
+                self.stderr.write(f'Failed: {task.action} {task.qualified_name}')
+            self.stderr.write(self.style.WARNING(f'{len(failed)} tables failed (see the log for errors)'))
@@ -0,0 +1,156 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from base.utils.tenancy import SHARED_SCHEMA
+
+SESSION_COLUMNS = 'id, date, notes, completed, created_at'
+ENTRY_COLUMNS = 'id, session_id, exercise_id, weight, status, created_at'
+ARCHIVE_COLUMNS = 'month, session_count, entry_count, payload, archived_at'
+
+
+class Command(BaseCommand):
+    """
+    Copy tenants from their user_N schemas into the shared tables, one tenant
+    per transaction, while the application keeps serving on the schema backend.
+
+    Each tenant's source tables are locked in EXCLUSIVE mode for the duration of
+    its copy, so reads continue but that tenant's writes wait a moment. Copied
+    tenants are recorded in tenant_shared.migrated_tenants with a checksum of the
+    source rows. Suggested rollout:
+
+        manage.py sync_tenant_schemas                 # every schema has the current tables
+        manage.py migrate_tenants_to_shared           # bulk copy, online
+        manage.py migrate_tenants_to_shared --verify  # re-copy tenants that changed since
+        # switch TENANCY_BACKEND to 'shared' and deploy
+
+    Writes made between the last --verify pass and the switch are not copied, so
+    keep that window short (or make the API read-only across it). Source schemas
+    are left in place for rollback; drop them once the switch has settled.
+    """
+    help = 'Copy per-user schemas into the shared row-level-security tenant tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', type=str, help='Only migrate this schema (e.g. user_42)')
+        parser.add_argument('--verify', action='store_true',
+                            help='Compare checksums of migrated tenants and re-copy any that changed')
+        parser.add_argument('--lock-timeout', type=str, default='5s',
+                            help='Give up on a tenant whose tables cannot be locked within this time')
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT to_regclass('{SHARED_SCHEMA}.migrated_tenants');")
+            if cursor.fetchone()[0] is None:
+                raise CommandError('Shared tenant tables do not exist yet; run setup_shared_tenancy first')
+            if options['schema']:
+                schemas = [options['schema']]
+            else:
+                cursor.execute(
+                    "SELECT nspname FROM pg_namespace WHERE nspname ~ '^user_[0-9]+$' ORDER BY nspname;"
+                )
+                schemas = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"SELECT user_id, source_checksum FROM {SHARED_SCHEMA}.migrated_tenants;")
+            migrated = dict(cursor.fetchall())
+
+        copied = skipped = failed = 0
+        for schema_name in schemas:
+            try:
+                user_id = int(schema_name.split('_', 1)[1])
+            except (IndexError, ValueError):
+                raise CommandError(f"'{schema_name}' is not a tenant schema (expected user_<id>)")
+
+            if user_id in migrated and not options['verify']:
+                skipped += 1
+                continue
+            try:
+                result = self._migrate_tenant(schema_name, user_id, migrated.get(user_id), options['lock_timeout'])
+            except Exception as e:
+                failed += 1
+                self.stdout.write(self.style.ERROR(f'{schema_name}: {e}'))
+                continue
+            if result is None:
+                skipped += 1
+            else:
+                copied += 1
+                self.stdout.write(f'{schema_name}: {result[0]} sessions, {result[1]} entries')
+
+        self._sync_sequences()
+        self.stdout.write(self.style.SUCCESS(
+            f'Copied {copied} tenants, {skipped} already up to date, {failed} failed'
+        ))
+
+    def _migrate_tenant(self, schema_name, user_id, previous_checksum, lock_timeout):
+        """Copy one tenant; returns (sessions, entries) or None if its checksum is unchanged"""
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('lock_timeout', %s, true);", [lock_timeout])
+            # Rows are written under this tenant's identity so the RLS policies accept them
+            cursor.execute("SELECT set_config('app.current_user_id', %s, true);", [str(user_id)])
+            # Block this tenant's writes (not reads) until the copy commits
+            cursor.execute(
+                f"LOCK TABLE {schema_name}.base_session, {schema_name}.base_sessionentry, "
+                f"{schema_name}.base_sessionarchive IN EXCLUSIVE MODE;"
+            )
+            checksum = self._checksum(cursor, schema_name)
+            if checksum == previous_checksum:
+                return None
+
+            cursor.execute(f"DELETE FROM {SHARED_SCHEMA}.base_session WHERE user_id = %s;", [user_id])
+            cursor.execute(f"DELETE FROM {SHARED_SCHEMA}.base_sessionarchive WHERE user_id = %s;", [user_id])
+            cursor.execute(
+                f"INSERT INTO {SHARED_SCHEMA}.base_session (user_id, {SESSION_COLUMNS}) "
+                f"SELECT %s, {SESSION_COLUMNS} FROM {schema_name}.base_session;",
+                [user_id],
+            )
+            sessions = cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {SHARED_SCHEMA}.base_sessionentry (user_id, {ENTRY_COLUMNS}) "
+                f"SELECT %s, {ENTRY_COLUMNS} FROM {schema_name}.base_sessionentry;",
+                [user_id],
+            )
+            entries = cursor.rowcount
+            cursor.execute(
+                f"INSERT INTO {SHARED_SCHEMA}.base_sessionarchive (user_id, {ARCHIVE_COLUMNS}) "
+                f"SELECT %s, {ARCHIVE_COLUMNS} FROM {schema_name}.base_sessionarchive;",
+                [user_id],
+            )
+            cursor.execute(
+                f"""
+                    INSERT INTO {SHARED_SCHEMA}.migrated_tenants (user_id, source_checksum)
+                    VALUES (%s, %s)
+                    ON CONFLICT (user_id) DO UPDATE
+                        SET source_checksum = EXCLUDED.source_checksum, migrated_at = NOW();
+                """,
+                [user_id, checksum],
+            )
+        return sessions, entries
+
+    def _checksum(self, cursor, schema_name):
+        """Order-independent digest of a tenant's source rows"""
+        cursor.execute(f"""
+            SELECT md5(
+                coalesce((SELECT string_agg(s::text, '|' ORDER BY s.id) FROM {schema_name}.base_session s), '')
+                || '#' ||
+                coalesce((SELECT string_agg(e::text, '|' ORDER BY e.id) FROM {schema_name}.base_sessionentry e), '')
+                || '#' ||
+                coalesce((SELECT string_agg(a::text, '|' ORDER BY a.id) FROM {schema_name}.base_sessionarchive a), '')
+            );
+        """)
+        return cursor.fetchone()[0]
+
+    def _sync_sequences(self):
+        """
+        Ids are copied as-is, so move the shared sequences past every copied id.
+        Per-schema ids overlap between tenants, which the (user_id, id) keys allow;
+        new rows get ids above all of them.
+        """
+        with connection.cursor() as cursor:
+            for table in ('base_session', 'base_sessionentry'):
+                cursor.execute(
+                    "SELECT nspname FROM pg_namespace WHERE nspname ~ '^user_[0-9]+$';"
+                )
+                schemas = [row[0] for row in cursor.fetchall()]
+                max_ids = ' UNION ALL '.join(f"SELECT max(id) AS id FROM {s}.{table}" for s in schemas) or 'SELECT 0'
+                cursor.execute(f"""
+                    SELECT setval('{SHARED_SCHEMA}.{table}_id_seq', GREATEST(
+                        (SELECT last_value FROM {SHARED_SCHEMA}.{table}_id_seq),
+                        (SELECT coalesce(max(id), 0) FROM ({max_ids}) AS ids)
+                    ));
+                """)
@@ -0,0 +1,59 @@
+import os
+import signal
+import socket
+import multiprocessing
+from django.core.management.base import BaseCommand
+from django.db import connections
+from base.utils.processes import init_worker
+
+
+def _worker_main(worker_id, stop, poll_interval, stale_after):
+    # Ctrl-C goes to the whole process group: let the parent decide when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    init_worker()
+    from base.jobs import work
+    work(worker_id, stop, poll_interval=poll_interval, stale_after=stale_after)
+
+
+class Command(BaseCommand):
+    """
+    Run background job workers (see base/jobs.py). Start as many of these, on as
+    many hosts, as needed: workers coordinate through the base_job table only.
+
+    SIGINT/SIGTERM stops claiming new jobs and waits for running ones to finish.
+    """
+    help = 'Run N worker processes that execute queued background jobs'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait between polls when the queue is empty')
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help='Requeue running jobs that have not reported progress for this many seconds')
+
+    def handle(self, *args, **options):
+        # Children must open their own connections
+        connections.close_all()
+        stop = multiprocessing.Event()
+        prefix = f"{socket.gethostname()}:{os.getpid()}"
+        processes = [
+            multiprocessing.Process(
+                target=_worker_main,
+                args=(f"{prefix}/{n}", stop, options['poll_interval'], options['stale_after']),
+                daemon=True,
+            )
+            for n in range(options['workers'])
+        ]
+        for process in processes:
+            process.start()
+        self.stdout.write(self.style.SUCCESS(f"Started {len(processes)} workers ({prefix})"))
+
+        def shutdown(signum, frame):
+            self.stdout.write('Stopping workers after their current jobs...')
+            stop.set()
+
+        signal.signal(signal.SIGINT, shutdown)
+        signal.signal(signal.SIGTERM, shutdown)
+        for process in processes:
+            process.join()
+        self.stdout.write(self.style.SUCCESS('Workers stopped'))
@@ -0,0 +1,106 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from django.core.management.base import BaseCommand
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import connections
+from base.utils.processes import init_worker
+from base.utils.synthetic_data import load_catalog, seed_tenants
+
+
+class Command(BaseCommand):
+    """
+    Create synthetic users, each with its own user_N schema and years of sessions,
+    for benchmarking the schema-per-user design at scale.
+    """
+    help = 'Seed N synthetic tenants with generated training history'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, required=True, help='Number of tenants to create')
+        parser.add_argument('--years', type=float, default=5, help='Years of history per tenant')
+        parser.add_argument(
+            '--sessions-per-week',
+            type=float,
+            default=4,
+            help='Average number of sessions per week'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of parallel worker processes'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=50,
+            help='Tenants handed to a worker per task'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed (per-tenant data is reproducible)')
+        parser.add_argument('--prefix', type=str, default='synthetic', help='Username/email prefix')
+        parser.add_argument('--password', type=str, default='synthetic-password', help='Password for every tenant')
+        parser.add_argument(
+            '--catalog',
+            type=str,
+            default='_legacy/exercises.csv',
+            help='Exercise catalog CSV to draw exercises from'
+        )
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        started = time.perf_counter()
+
+        catalog = load_catalog(options['catalog'])
+        self.stdout.write(f'Loaded {len(catalog)} catalog exercises')
+
+        user_ids = self._create_users(prefix, options['users'], options['password'])
+        self.stdout.write(f'Created {len(user_ids)} users ({prefix}_N)')
+
+        # Workers open their own connections; never share the parent's sockets with forked children
+        connections.close_all()
+
+        chunk_size = options['chunk_size']
+        chunks = [user_ids[i:i + chunk_size] for i in range(0, len(user_ids), chunk_size)]
+        sessions_created = 0
+        entries_created = 0
+        with ProcessPoolExecutor(max_workers=options['workers'], initializer=init_worker) as pool:
+            futures = [
+                pool.submit(
+                    seed_tenants, chunk, catalog,
+                    options['years'], options['sessions_per_week'], options['seed']
+                )
+                for chunk in chunks
+            ]
+            for done, future in enumerate(as_completed(futures), start=1):
+                sessions, entries = future.result()
+                sessions_created += sessions
+                entries_created += entries
+                self.stdout.write(
+                    f'  [{done}/{len(chunks)}] {sessions_created} sessions, {entries_created} entries'
+                )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Seeded {len(user_ids)} tenants with {sessions_created} sessions and '
+            f'{entries_created} entries in {time.perf_counter() - started:.1f}s'
+        ))
+
+    def _create_users(self, prefix, count, password):
+        """Bulk-create users numbered after any existing ones with the same prefix"""
+        pattern = re.compile(rf'^{re.escape(prefix)}_(\d+)$')
+        existing = User.objects.filter(username__regex=rf'^{re.escape(prefix)}_[0-9]+$').values_list('username', flat=True)
+        start = max((int(pattern.match(username).group(1)) for username in existing), default=0) + 1
+
+        # Hashing is deliberately slow, so hash once and share it across all users
+        hashed_password = make_password(password)
+        users = [
+            User(
+                username=f'{prefix}_{i}',
+                email=f'{prefix}_{i}@example.com',
+                password=hashed_password,
+            )
+            for i in range(start, start + count)
+        ]
+        created = User.objects.bulk_create(users, batch_size=1000)
+        return [user.id for user in created]
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from base.utils.tenancy import DEFAULT_SHARED_PARTITIONS, SHARED_SCHEMA, shared_tenancy_ddl
+
+
+class Command(BaseCommand):
+    """
+    Create (or bring up to date) the shared tenant tables used by
+    TENANCY_BACKEND = 'shared'. Safe to re-run.
+
+    The partition count is fixed once the tables exist: re-run with the same
+    --partitions value.
+    """
+    help = 'Create the hash-partitioned, row-level-security tenant tables'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--partitions', type=int, default=DEFAULT_SHARED_PARTITIONS,
+                            help='Number of hash partitions per table')
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            for statement in shared_tenancy_ddl(options['partitions']):
+                cursor.execute(statement)
+            cursor.execute("SELECT rolsuper OR rolbypassrls FROM pg_roles WHERE rolname = current_user;")
+            bypasses_rls = cursor.fetchone()[0]
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Shared tenant tables ready in schema '{SHARED_SCHEMA}' ({options['partitions']} partitions)"
+        ))
+        if bypasses_rls:
+            self.stdout.write(self.style.WARNING(
+                'The current database role is a superuser or has BYPASSRLS: row-level security '
+                'is not enforced for it. Run the application as an ordinary role.'
+            ))
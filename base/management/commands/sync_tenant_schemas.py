@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import connection
+from base.utils.user_context import tenant_schema_ddl
+
+
+class Command(BaseCommand):
+    """
+    Re-apply the (idempotent) tenant DDL to every existing user_N schema, e.g.
+    to add indexes introduced after those schemas were created.
+    """
+    help = 'Bring every existing tenant schema up to date with tenant_schema_ddl()'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--schema', type=str, help='Only sync this schema (e.g. user_42)')
+
+    def handle(self, *args, **options):
+        with connection.cursor() as cursor:
+            if options['schema']:
+                schemas = [options['schema']]
+            else:
+                cursor.execute(
+                    "SELECT nspname FROM pg_namespace WHERE nspname ~ '^user_[0-9]+$' ORDER BY nspname;"
+                )
+                schemas = [row[0] for row in cursor.fetchall()]
+
+            for schema_name in schemas:
+                for statement in tenant_schema_ddl(schema_name):
+                    cursor.execute(statement)
+
+        self.stdout.write(self.style.SUCCESS(f'Synced {len(schemas)} tenant schemas'))
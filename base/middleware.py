@@ -0,0 +1,336 @@
+import cProfile
+import random
+import threading
+import time
+from contextlib import ExitStack
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.http import JsonResponse
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.settings import api_settings
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from rest_framework_simplejwt.tokens import AccessToken
+from base.utils.metrics import RequestMetrics, QueryRecorder, registry, track_request
+from base.utils.profiling import SQLLogRecorder, save_capture
+
+
+# Query parameters never written to profiling captures (event streams pass their JWT as ?token=)
+CAPTURE_HIDDEN_PARAMS = ('token',)
+
+
+def _install_execute_wrapper(wrapper):
+    for conn in connections.all():
+        conn.execute_wrappers.append(wrapper)
+
+
+def _remove_execute_wrapper(wrapper):
+    for conn in connections.all():
+        if wrapper in conn.execute_wrappers:
+            conn.execute_wrappers.remove(wrapper)
+
+
+def client_ip(request):
+    """
+    The client's address for per-client limits. X-Forwarded-For is client
+    controlled, so only the entry added by the outermost of NUM_PROXIES trusted
+    proxies is used; with NUM_PROXIES = 0 (the default) it's REMOTE_ADDR.
+    """
+    num_proxies = api_settings.NUM_PROXIES or 0
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    if num_proxies and forwarded:
+        addresses = [address.strip() for address in forwarded.split(',')]
+        return addresses[-min(num_proxies, len(addresses))]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+class PerformanceMetricsMiddleware:
+    """
+    Record per-request query count, SQL time, search_path switches, serializer
+    and render time and response size.
+
+    The numbers are returned to the client in a Server-Timing header and
+    aggregated into the per-endpoint histograms served at /api/_metrics.
+    Works in both sync (WSGI) and async (ASGI) mode.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        metrics = RequestMetrics()
+        request._metrics_view_done = None
+
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(QueryRecorder(metrics)))
+            stack.enter_context(track_request(metrics))
+            response = self.get_response(request)
+
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        recorder = QueryRecorder(metrics)
+        request._metrics_view_done = None
+
+        # Connections are per thread: install the recorder from the thread that runs
+        # this request's sync_to_async ORM calls (the same one for the whole request)
+        await sync_to_async(_install_execute_wrapper)(recorder)
+        try:
+            with track_request(metrics):
+                response = await self.get_response(request)
+        finally:
+            await sync_to_async(_remove_execute_wrapper)(recorder)
+
+        return self._finish(request, response, metrics)
+
+    def _finish(self, request, response, metrics):
+        finished = time.perf_counter()
+        total = finished - metrics.started
+        # DRF responses are rendered after process_template_response has run
+        view_done = request._metrics_view_done
+        render = finished - view_done if view_done is not None else 0.0
+        size = None if response.streaming else len(response.content)
+
+        response['Server-Timing'] = self._server_timing(metrics, total, render)
+
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match and match.view_name else 'unmatched'
+        registry.record_request(endpoint, request.method, metrics, total, render, size)
+        return response
+
+    def process_template_response(self, request, response):
+        request._metrics_view_done = time.perf_counter()
+        return response
+
+    @staticmethod
+    def _server_timing(metrics, total, render):
+        entries = [
+            f'db;dur={metrics.sql_time * 1000:.2f};desc="{metrics.query_count} queries"',
+            f'search-path;desc="{metrics.search_path_switches} switches"',
+        ]
+        for name, elapsed in metrics.sections.items():
+            entries.append(f'{name};dur={elapsed * 1000:.2f}')
+        entries.append(f'render;dur={render * 1000:.2f}')
+        entries.append(f'total;dur={total * 1000:.2f}')
+        return ', '.join(entries)
+
+
+class RequestProfilingMiddleware:
+    """
+    Opt-in cProfile capture of individual requests.
+
+    A request is profiled when it carries the PROFILING_HEADER with a staff
+    user's JWT, or when it is picked by PROFILING_SAMPLE_RATE. The profile and
+    the request's SQL log are written to PROFILING_DIR (see list_profiles).
+
+    In async mode requests are passed straight through, so the middleware does
+    not force every ASGI request onto a thread; profiled requests are handed to
+    the sync path on a worker thread.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._should_profile(request):
+            return self.get_response(request)
+        return self._profile(request, self.get_response)
+
+    async def __acall__(self, request):
+        if not self._may_profile(request):
+            return await self.get_response(request)
+        if not await sync_to_async(self._should_profile)(request):
+            return await self.get_response(request)
+        return await sync_to_async(self._profile)(request, async_to_sync(self.get_response))
+
+    def _profile(self, request, get_response):
+        """Run get_response under cProfile and save the capture"""
+        profiler = cProfile.Profile()
+        sql_log = SQLLogRecorder()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for conn in connections.all():
+                stack.enter_context(conn.execute_wrapper(sql_log))
+            profiler.enable()
+            try:
+                response = get_response(request)
+            finally:
+                profiler.disable()
+        duration = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        user = self._profiling_user(request)
+        save_capture(profiler, {
+            'endpoint': match.view_name if match and match.view_name else 'unmatched',
+            'method': request.method,
+            'path': self._capture_path(request),
+            'user_id': user.id if user else None,
+            'status': response.status_code,
+            'duration_ms': round(duration * 1000, 3),
+            'query_count': len(sql_log.statements),
+            'captured_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        }, sql_log.statements)
+        return response
+
+    @staticmethod
+    def _capture_path(request):
+        """The request path and query, minus credentials passed in the query (e.g. ?token=)"""
+        query = request.GET.copy()
+        for param in CAPTURE_HIDDEN_PARAMS:
+            query.pop(param, None)
+        return f'{request.path}?{query.urlencode()}' if query else request.path
+
+    @staticmethod
+    def _may_profile(request):
+        """Cheap pre-check that needs no database access"""
+        prefixes = getattr(settings, 'PROFILING_PATH_PREFIXES', ('/api/',))
+        if not request.path.startswith(tuple(prefixes)):
+            return False
+        header = getattr(settings, 'PROFILING_HEADER', 'HTTP_X_PROFILE_REQUEST')
+        return bool(request.META.get(header)) or getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0) > 0
+
+    def _should_profile(self, request):
+        if not self._may_profile(request):
+            return False
+
+        header = getattr(settings, 'PROFILING_HEADER', 'HTTP_X_PROFILE_REQUEST')
+        if request.META.get(header):
+            user = self._profiling_user(request)
+            return bool(user and user.is_staff)
+
+        sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0.0)
+        return sample_rate > 0 and random.random() < sample_rate
+
+    @staticmethod
+    def _profiling_user(request):
+        """
+        Resolve the JWT user ahead of DRF (middleware runs before view authentication).
+        Only reached for requests that asked to be profiled or were sampled.
+        """
+        if not hasattr(request, '_profiling_user'):
+            try:
+                result = JWTAuthentication().authenticate(request)
+            except (InvalidToken, AuthenticationFailed):
+                result = None
+            request._profiling_user = result[0] if result else None
+        return request._profiling_user
+
+
+class ConcurrencyLimitMiddleware:
+    """
+    Shed load before the database saturates.
+
+    Counts in-flight requests under CONCURRENCY_LIMIT_PATH_PREFIXES in this
+    process. Past MAX_CONCURRENT_REQUESTS (keep it at or below the connections
+    one worker can hold) new requests get a 503; a single user with more than
+    MAX_CONCURRENT_REQUESTS_PER_USER in flight gets a 429. Both carry
+    Retry-After and are counted in http_requests_rejected_total. A slot is
+    released when the view returns, so streamed responses don't hold one.
+
+    The user is read from the JWT's claims (signature and expiry checked, no
+    database query); requests without a valid token are limited per client IP
+    (client_ip(), as for the anonymous token buckets).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._per_client = {}
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._limited(request):
+            return self.get_response(request)
+        client, rejection = self._admit(request)
+        if rejection is not None:
+            return rejection
+        try:
+            return self.get_response(request)
+        finally:
+            self._release(client)
+
+    async def __acall__(self, request):
+        if not self._limited(request):
+            return await self.get_response(request)
+        client, rejection = self._admit(request)
+        if rejection is not None:
+            return rejection
+        try:
+            return await self.get_response(request)
+        finally:
+            self._release(client)
+
+    @staticmethod
+    def _limited(request):
+        # CORS preflights don't reach a view and shouldn't take a slot
+        if request.method == 'OPTIONS':
+            return False
+        prefixes = getattr(settings, 'CONCURRENCY_LIMIT_PATH_PREFIXES', ('/api/',))
+        return request.path.startswith(tuple(prefixes))
+
+    def _admit(self, request):
+        """Take a slot: returns (client key or None, None), or (None, rejection response)"""
+        limit = getattr(settings, 'MAX_CONCURRENT_REQUESTS', None)
+        per_client_limit = getattr(settings, 'MAX_CONCURRENT_REQUESTS_PER_USER', None)
+        client = self._client_key(request) if per_client_limit else None
+        with self._lock:
+            if limit and self._in_flight >= limit:
+                return None, self._reject(503, 'overloaded', 'global', 'Server is busy, please retry shortly.')
+            if client is not None and self._per_client.get(client, 0) >= per_client_limit:
+                return None, self._reject(429, 'concurrency', 'user', 'Too many concurrent requests.')
+            self._in_flight += 1
+            if client is not None:
+                self._per_client[client] = self._per_client.get(client, 0) + 1
+        return client, None
+
+    def _release(self, client):
+        with self._lock:
+            self._in_flight -= 1
+            if client is not None:
+                remaining = self._per_client[client] - 1
+                if remaining:
+                    self._per_client[client] = remaining
+                else:
+                    del self._per_client[client]
+
+    @staticmethod
+    def _reject(status, reason, scope, detail):
+        registry.increment('http_requests_rejected_total', (('reason', reason), ('scope', scope)))
+        response = JsonResponse({'detail': detail}, status=status)
+        response['Retry-After'] = str(getattr(settings, 'LOAD_SHED_RETRY_AFTER', 1))
+        return response
+
+    @staticmethod
+    def _client_key(request):
+        header = request.META.get('HTTP_AUTHORIZATION', '')
+        # EventSource can't send headers, so event streams pass ?token=
+        raw_token = header[7:] if header.startswith('Bearer ') else request.GET.get('token')
+        if raw_token:
+            try:
+                return f'user:{AccessToken(raw_token)[jwt_settings.USER_ID_CLAIM]}'
+            except (TokenError, KeyError):
+                pass
+        return f'ip:{client_ip(request)}'
@@ -0,0 +1,25 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    Index auth_user.email, which is the login identifier for this project.
+
+    auth_user belongs to django.contrib.auth so the index is created with raw SQL
+    rather than through a model Meta. It is a plain (non-unique) index because
+    earlier registrations were allowed to reuse an email address.
+    """
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('base', '0004_session_user_alter_session_notes'),
+        ('auth', '0012_alter_user_first_name_max_length'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="CREATE INDEX CONCURRENTLY IF NOT EXISTS auth_user_email_idx ON auth_user (email);",
+            reverse_sql="DROP INDEX CONCURRENTLY IF EXISTS auth_user_email_idx;",
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:02
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0005_auth_user_email_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=50)),
+                ('payload', models.JSONField(blank=True, default=dict)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=20)),
+                ('result', models.JSONField(blank=True, null=True)),
+                ('error', models.TextField(blank=True, default='')),
+                ('progress_done', models.IntegerField(default=0)),
+                ('progress_total', models.IntegerField(default=0)),
+                ('attempts', models.IntegerField(default=0)),
+                ('max_attempts', models.IntegerField(default=3)),
+                ('run_after', models.DateTimeField(default=django.utils.timezone.now)),
+                ('locked_by', models.CharField(blank=True, default='', max_length=100)),
+                ('locked_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'run_after'], name='base_job_claim_idx'), models.Index(fields=['user', '-created_at'], name='base_job_user_idx')],
+            },
+        ),
+    ]
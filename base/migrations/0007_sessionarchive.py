@@ -0,0 +1,32 @@
+# Generated by Django 5.2.9 on 2026-10-18 23:09
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('base', '0006_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SessionArchive',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField()),
+                ('session_count', models.IntegerField(default=0)),
+                ('entry_count', models.IntegerField(default=0)),
+                ('payload', models.JSONField(default=dict)),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'month'), name='base_sessionarchive_user_month_uniq')],
+            },
+        ),
+    ]
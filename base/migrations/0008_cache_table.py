@@ -0,0 +1,23 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_table(apps, schema_editor):
+    # No-op unless a DatabaseCache is configured and its table is missing
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+    """
+    Create the table behind the default DatabaseCache (settings.CACHES), which
+    holds state every process must agree on: catalog/analytics versions,
+    replica pins and throttle buckets.
+    """
+
+    dependencies = [
+        ('base', '0007_sessionarchive'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_table, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 from base.utils.user_context import UserSchemaManager
 
 
@@ -42,4 +43,64 @@ class SessionEntry(models.Model):
     weight = models.CharField(max_length=50)
     status = models.CharField(max_length=50)
     
-    objects = UserSchemaManager()
\ No newline at end of file
+    objects = UserSchemaManager()
+
+# One month of a user's old sessions and entries, compacted by `manage.py archive_history`
+class SessionArchive(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # First day of the archived month
+    month = models.DateField()
+    session_count = models.IntegerField(default=0)
+    entry_count = models.IntegerField(default=0)
+    # Column-oriented rows, see base/utils/archive.py (JSONB is TOAST-compressed by PostgreSQL)
+    payload = models.JSONField(default=dict)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    objects = UserSchemaManager()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'month'], name='base_sessionarchive_user_month_uniq'),
+        ]
+
+    def __str__(self):
+        return f"Archive {self.month:%Y-%m} ({self.session_count} sessions)"
+
+
+class Job(models.Model):
+    """
+    Background job stored in the public schema and run by `manage.py run_workers`.
+    Handlers are registered by kind in base/jobs.py.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=50)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    progress_done = models.IntegerField(default=0)
+    progress_total = models.IntegerField(default=0)
+    attempts = models.IntegerField(default=0)
+    max_attempts = models.IntegerField(default=3)
+    # Not claimed before this time (used for retry backoff)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Claim query: next queued job whose run_after has passed
+            models.Index(fields=['status', 'run_after'], name='base_job_claim_idx'),
+            models.Index(fields=['user', '-created_at'], name='base_job_user_idx'),
+        ]
+
+    def __str__(self):
+        return f"Job {self.id} {self.kind} ({self.status})"
@@ -1,7 +1,33 @@
+import re
 from rest_framework import serializers
 from django.contrib.auth.models import User
+from django.db import IntegrityError, transaction
 from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
-from django.contrib.auth import authenticate
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Attempts at claiming a generated username before giving up (only hit under concurrent registrations)
+USERNAME_ALLOCATION_ATTEMPTS = 5
+
+
+def allocate_username(base_username: str) -> str:
+    """
+    Return the first free username of the form base, base1, base2, ...
+
+    All existing usernames sharing the prefix are fetched in a single query,
+    rather than probing each candidate with its own exists() call.
+    """
+    taken = set(
+        User.objects.filter(
+            username__regex=rf'^{re.escape(base_username)}[0-9]*$'
+        ).values_list('username', flat=True)
+    )
+    if base_username not in taken:
+        return base_username
+
+    counter = 1
+    while f"{base_username}{counter}" in taken:
+        counter += 1
+    return f"{base_username}{counter}"
 
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
@@ -16,6 +42,12 @@ class RegisterSerializer(serializers.ModelSerializer):
         model = User
         fields = ('email', 'password', 'password2', 'first_name', 'last_name')
     
+    def validate_email(self, value):
+        """Reject emails that are already registered (uses the auth_user email index)"""
+        if User.objects.filter(email=value).exists():
+            raise serializers.ValidationError('A user with this email already exists')
+        return value
+    
     def validate(self, data):
         if data['password'] != data['password2']:
             raise serializers.ValidationError({'password': 'Passwords must match'})
@@ -25,23 +57,24 @@ class RegisterSerializer(serializers.ModelSerializer):
         validated_data.pop('password2')
         # Generate username from email
         email = validated_data['email']
-        username = email.split('@')[0]
-        
-        # Ensure unique username
-        base_username = username
-        counter = 1
-        while User.objects.filter(username=username).exists():
-            username = f"{base_username}{counter}"
-            counter += 1
+        base_username = email.split('@')[0]
         
-        user = User.objects.create_user(
-            username=username,
-            email=email,
-            password=validated_data['password'],
-            first_name=validated_data.get('first_name', ''),
-            last_name=validated_data.get('last_name', '')
-        )
-        return user
+        # Allocate a unique username in one query, retrying if a concurrent
+        # registration claims the same name between the lookup and the insert
+        for _ in range(USERNAME_ALLOCATION_ATTEMPTS):
+            username = allocate_username(base_username)
+            try:
+                with transaction.atomic():
+                    return User.objects.create_user(
+                        username=username,
+                        email=email,
+                        password=validated_data['password'],
+                        first_name=validated_data.get('first_name', ''),
+                        last_name=validated_data.get('last_name', '')
+                    )
+            except IntegrityError:
+                continue
+        raise serializers.ValidationError({'email': 'Could not allocate a username, please retry'})
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """Creates custom token for email authentication."""
@@ -61,20 +94,18 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         if not email or not password:
             raise serializers.ValidationError({'detail': 'Email and password required'})
         
-        try:
-            # Get the most recent user with this email (in case of duplicates)
-            user = User.objects.filter(email=email).latest('id')
-        except User.DoesNotExist:
+        # Get the most recent user with this email (in case of legacy duplicates)
+        user = User.objects.filter(email=email).order_by('-id').first()
+        if user is None:
             raise serializers.ValidationError({'email': 'User not found'})
         
-        # Authenticate using Django's authenticate function
-        authenticated_user = authenticate(username=user.username, password=password)
-        if authenticated_user is None:
+        # Check the password on the user we already fetched rather than going through
+        # authenticate(), which would look the same user up again by username
+        if not user.check_password(password) or not user.is_active:
             raise serializers.ValidationError({'password': 'Invalid password'})
         
         # Now generate the tokens manually since we've already authenticated
-        from rest_framework_simplejwt.tokens import RefreshToken
-        refresh = RefreshToken.for_user(authenticated_user)
+        refresh = RefreshToken.for_user(user)
         
         return {
             'refresh': str(refresh),
@@ -0,0 +1,29 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from base.models import Exercise, MuscleGroup, ExerciseType, Session, SessionEntry, SessionArchive
+from base.utils.analytics import invalidate_analytics
+from base.utils.exercise_search import bump_catalog_version
+from base.utils.user_context import current_tenant_id
+
+
+@receiver([post_save, post_delete], sender=Exercise)
+@receiver([post_save, post_delete], sender=MuscleGroup)
+@receiver([post_save, post_delete], sender=ExerciseType)
+def invalidate_exercise_index(sender, **kwargs):
+    """Any catalog change invalidates the exercise suggestion index, once committed"""
+    # Bumping before commit would let another process rebuild from the old rows under the new version
+    transaction.on_commit(bump_catalog_version)
+
+
+# No post_delete: receivers would make every cascade delete row by row, so
+# the code deleting history calls invalidate_analytics() itself
+@receiver(post_save, sender=Session)
+@receiver(post_save, sender=SessionEntry)
+@receiver(post_save, sender=SessionArchive)
+def invalidate_user_analytics(sender, instance, **kwargs):
+    """Saving part of a user's history invalidates their cached analytics"""
+    # Tenant rows are written inside the owner's tenant context; entries don't carry a user id
+    user_id = current_tenant_id() or getattr(instance, 'user_id', None)
+    if user_id is not None:
+        invalidate_analytics(user_id)
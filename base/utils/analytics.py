@@ -0,0 +1,269 @@
+"""
+Strength analytics over a user's full history, computed with NumPy.
+
+All entries (hot and archived) are loaded once into flat arrays and every
+exercise is processed in the same vectorised passes:
+
+- estimated one-rep max per entry (Epley: weight * (1 + reps / 30)). Reps are
+  not recorded, so each status stands for an assumed rep count (ASSUMED_REPS)
+- the best estimate per exercise per day, as the exercise's series
+- rolling least-squares slope over the last `window` points of each series,
+  from cumulative sums (no per-window loop)
+- a trend status from the latest slope: progressing, plateau or regressing
+- training frequency per muscle group over the last `weeks` weeks
+
+Results are cached per user, keyed by a data version that is bumped (on
+commit) whenever their history changes, so repeat requests cost one cache
+read. Saves are caught by signals; deletes, archiving and bulk inserts call
+invalidate_analytics() themselves, since delete signals would stop Django
+from deleting cascades in bulk and bulk_create sends none.
+"""
+import hashlib
+import json
+from datetime import date, timedelta
+import numpy as np
+import pandas as pd
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F, Func, IntegerField
+from base.models import Exercise, MuscleGroup, SessionEntry
+from base.utils.archive import archived_entry_rows
+from base.utils.exercise_search import catalog_version
+from base.utils.user_context import user_schema_context
+
+DATA_VERSION_KEY = 'analytics-data-version:{user_id}'
+RESULT_KEY = 'analytics:{user_id}:{version}:{catalog}:{today}:{params}'
+RESULT_TIMEOUT = 60 * 60 * 24
+
+# Reps assumed for each entry status when estimating one-rep maxes
+ASSUMED_REPS = {'Peak': 5, 'Static': 8, 'Working': 10}
+DEFAULT_ASSUMED_REPS = 8
+# Weekly change (as a fraction of the current estimate) below which a lift has plateaued
+PLATEAU_THRESHOLD = 0.005
+
+EPOCH = date(1970, 1, 1)
+# Days since EPOCH, as datetime64[D] counts them
+EPOCH_DAY_SQL = "(%(expressions)s - DATE '1970-01-01')"
+
+
+def data_version(user_id):
+    """Current analytics data version for a user (initialised on first use)"""
+    key = DATA_VERSION_KEY.format(user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, 1, timeout=None)
+        version = cache.get(key, 1)
+    return version
+
+
+def bump_data_version(user_id):
+    """Invalidate a user's cached analytics"""
+    key = DATA_VERSION_KEY.format(user_id=user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 2, timeout=None)
+
+
+def invalidate_analytics(user_id):
+    """
+    Bump a user's data version once the current transaction commits (right away
+    in autocommit). Repeated calls within a transaction still bump only once.
+    """
+    # Bumping before commit would let a concurrent request cache the old rows under the new version
+    connection = transaction.get_connection()
+    pending = getattr(connection, '_analytics_pending', None)
+    if pending is None:
+        pending = connection._analytics_pending = set()
+    pending.add(user_id)
+
+    def bump():
+        # The first of the user's hooks to run at commit bumps, the rest find nothing pending.
+        # (A rolled-back transaction's ids stay in the set, but its hooks never run)
+        if user_id in pending:
+            pending.discard(user_id)
+            bump_data_version(user_id)
+
+    transaction.on_commit(bump)
+
+
+def load_entries(user):
+    """
+    The user's entries as parallel arrays (day number, exercise id, weight, assumed reps).
+    Hot entries come from one query, with the day number computed by PostgreSQL;
+    archived months are appended. Non-numeric weights (e.g. durations) become NaN.
+    """
+    with user_schema_context(user):
+        hot = list(
+            SessionEntry.objects.filter(session__user=user)
+            .annotate(day=Func(F('session__date'), template=EPOCH_DAY_SQL, output_field=IntegerField()))
+            .values_list('day', 'exercise_id', 'weight', 'status')
+        )
+        archived = list(archived_entry_rows(user))
+
+    if not hot and not archived:
+        empty = np.empty(0)
+        return empty.astype(np.int64), empty.astype(np.int64), empty, empty
+    hot_days, hot_exercises, hot_weights, hot_statuses = zip(*hot) if hot else ((), (), (), ())
+    archived_dates, archived_exercises, archived_weights, archived_statuses = (
+        zip(*archived) if archived else ((), (), (), ())
+    )
+    days = np.concatenate([
+        np.array(hot_days, dtype=np.int64),
+        # ISO date strings parse straight into datetime64
+        np.array(archived_dates, dtype='datetime64[D]').astype(np.int64),
+    ])
+    exercise_ids = np.array(hot_exercises + archived_exercises, dtype=np.int64)
+    weights = pd.to_numeric(pd.Series(hot_weights + archived_weights, dtype=object), errors='coerce').to_numpy(dtype=float)
+    reps = (
+        pd.Series(hot_statuses + archived_statuses, dtype=object)
+        .map(ASSUMED_REPS).fillna(DEFAULT_ASSUMED_REPS).to_numpy(dtype=float)
+    )
+    return days, exercise_ids, weights, reps
+
+
+def rolling_slopes(x, y, group_starts, window):
+    """
+    Least-squares slope of y on x over each trailing window of `window` points,
+    computed for all groups at once from cumulative sums. Entry i is the slope
+    of points i-window+1..i, or NaN where that window would cross into the
+    previous group (group_starts[i] is the index where i's group begins).
+    """
+    n = len(x)
+    slopes = np.full(n, np.nan)
+    if n < window or window < 2:
+        return slopes
+
+    def window_sums(values):
+        cumulative = np.concatenate(([0.0], np.cumsum(values)))
+        return cumulative[window:] - cumulative[:-window]
+
+    # Shift x to start at zero to keep the sums well conditioned
+    x = x - x.min()
+    sx, sy = window_sums(x), window_sums(y)
+    sxx, sxy = window_sums(x * x), window_sums(x * y)
+    denominator = window * sxx - sx * sx
+    with np.errstate(invalid='ignore', divide='ignore'):
+        window_slopes = (window * sxy - sx * sy) / denominator
+    ends = np.arange(window - 1, n)
+    valid = (ends - window + 1 >= group_starts[ends]) & (denominator != 0)
+    slopes[ends[valid]] = window_slopes[valid]
+    return slopes
+
+
+def compute_analytics(user, exercise_ids=None, window=6, weeks=12, include_series=False, today=None):
+    """Analyse a user's history (see module docstring); returns a JSON-serialisable dict"""
+    today = today or date.today()
+    days, entry_exercises, weights, reps = load_entries(user)
+
+    exercises = {
+        e.id: e for e in Exercise.objects.select_related('muscle_group').filter(id__in=np.unique(entry_exercises).tolist())
+    }
+    muscle_groups = dict(MuscleGroup.objects.values_list('id', 'muscle_group_name'))
+
+    # Archived entries may refer to exercises deleted since (they have no foreign key);
+    # without a muscle group or name they are left out of both passes
+    catalog_ids = np.array(sorted(exercises), dtype=np.int64)
+    known = np.isin(entry_exercises, catalog_ids)
+    days, entry_exercises, weights, reps = days[known], entry_exercises[known], weights[known], reps[known]
+
+    # ----- Training frequency per muscle group: distinct (day, group) pairs in range -----
+    since = (today - timedelta(weeks=weeks) - EPOCH).days
+    catalog_groups = np.array([exercises[i].muscle_group_id for i in catalog_ids.tolist()], dtype=np.int64)
+    # Every remaining id is in catalog_ids, so searchsorted finds its exact position
+    entry_groups = catalog_groups[np.searchsorted(catalog_ids, entry_exercises)]
+    recent = days > since
+    pairs = np.unique(np.stack([days[recent], entry_groups[recent]]), axis=1) if recent.any() else np.empty((2, 0))
+    group_ids, group_days = np.unique(pairs[1].astype(np.int64), return_counts=True)
+    frequency = sorted(
+        (
+            {
+                'muscle_group_id': int(group_id),
+                'muscle_group_name': muscle_groups.get(int(group_id), ''),
+                'sessions_per_week': round(int(count) / weeks, 2),
+            }
+            for group_id, count in zip(group_ids, group_days)
+        ),
+        key=lambda row: -row['sessions_per_week'],
+    )
+
+    # ----- Estimated 1RM: best per exercise per day -----
+    e1rm = weights * (1 + reps / 30)
+    keep = np.isfinite(e1rm) & (e1rm > 0)
+    if exercise_ids:
+        keep &= np.isin(entry_exercises, list(exercise_ids))
+    ex, d, est = entry_exercises[keep], days[keep], e1rm[keep]
+
+    order = np.lexsort((d, ex))
+    ex, d, est = ex[order], d[order], est[order]
+    if len(ex):
+        day_starts = np.flatnonzero(np.r_[True, (ex[1:] != ex[:-1]) | (d[1:] != d[:-1])])
+        ex, d, est = ex[day_starts], d[day_starts], np.maximum.reduceat(est, day_starts)
+
+    # Series boundaries: index where each exercise's points begin
+    starts = np.flatnonzero(np.r_[True, ex[1:] != ex[:-1]]) if len(ex) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(ex)].astype(np.int64)
+    group_starts = np.repeat(starts, ends - starts)
+    slopes = rolling_slopes(d.astype(float), est, group_starts, window)
+
+    results = []
+    for start, end in zip(starts.tolist(), ends.tolist()):
+        exercise = exercises[int(ex[start])]
+        current = float(est[end - 1])
+        slope = slopes[end - 1]
+        if np.isnan(slope):
+            trend_per_week, relative, status = None, None, 'insufficient_data'
+        else:
+            trend_per_week = float(slope * 7)
+            relative = trend_per_week / current
+            status = (
+                'progressing' if relative > PLATEAU_THRESHOLD
+                else 'regressing' if relative < -PLATEAU_THRESHOLD
+                else 'plateau'
+            )
+        row = {
+            'exercise_id': exercise.id,
+            'exercise_name': exercise.exercise_name,
+            'muscle_group': exercise.muscle_group.muscle_group_name,
+            'sessions': end - start,
+            'first_date': (EPOCH + timedelta(days=int(d[start]))).isoformat(),
+            'last_date': (EPOCH + timedelta(days=int(d[end - 1]))).isoformat(),
+            'current_e1rm': round(current, 1),
+            'best_e1rm': round(float(est[start:end].max()), 1),
+            'trend_per_week': None if trend_per_week is None else round(trend_per_week, 2),
+            'trend_pct_per_week': None if relative is None else round(relative * 100, 2),
+            'status': status,
+        }
+        if include_series:
+            row['series'] = [
+                {'date': (EPOCH + timedelta(days=int(day))).isoformat(), 'e1rm': round(float(value), 1)}
+                for day, value in zip(d[start:end], est[start:end])
+            ]
+        results.append(row)
+
+    results.sort(key=lambda row: row['last_date'], reverse=True)
+    return {
+        'exercises': results,
+        'muscle_group_frequency': frequency,
+        'parameters': {
+            'window': window,
+            'weeks': weeks,
+            'assumed_reps': ASSUMED_REPS,
+            'plateau_threshold_pct_per_week': PLATEAU_THRESHOLD * 100,
+        },
+    }
+
+
+def get_analytics(user, **params):
+    """compute_analytics(), memoised until the user's data or the catalog changes"""
+    params_key = hashlib.md5(json.dumps(params, sort_keys=True, default=str).encode()).hexdigest()
+    # The date is part of the key because the frequency window ends today
+    key = RESULT_KEY.format(
+        user_id=user.id, version=data_version(user.id), catalog=catalog_version(),
+        today=date.today().isoformat(), params=params_key,
+    )
+    result = cache.get(key)
+    if result is None:
+        result = compute_analytics(user, **params)
+        cache.set(key, result, timeout=RESULT_TIMEOUT)
+    return result
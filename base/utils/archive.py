@@ -0,0 +1,218 @@
+"""
+Archival of old training history.
+
+Months older than the archive horizon are compacted into one SessionArchive
+row per month and removed from the hot base_session/base_sessionentry tables,
+keeping those tables and their indexes small. The payload is column-oriented
+(one list per field) so repeated keys are not stored per row:
+
+    {"sessions": {"id": [...], "date": [...], "notes": [...], "completed": [...]},
+     "entries":  {"id": [...], "session_id": [...], "exercise_id": [...],
+                  "weight": [...], "status": [...]}}
+
+Archived sessions are read-only. Session lists and exports merge them back in
+through archived_sessions()/archived_entry_rows(). Archived exercise ids have no
+foreign key, so an exercise deleted since is shown as DELETED_EXERCISE_NAME.
+"""
+from datetime import date, timedelta
+from django.db import transaction
+from django.db.models import Min
+from base.models import Session, SessionEntry, SessionArchive, Exercise
+from base.utils.user_context import user_schema_context
+
+SESSION_FIELDS = ['id', 'date', 'notes', 'completed']
+ENTRY_FIELDS = ['id', 'session_id', 'exercise_id', 'weight', 'status']
+DELETED_EXERCISE_NAME = 'Deleted exercise'
+
+
+def archive_cutoff(horizon_days: int, today: date = None) -> date:
+    """First day of the oldest month that stays hot: whole months before it are archived"""
+    today = today or date.today()
+    return (today - timedelta(days=horizon_days)).replace(day=1)
+
+
+def _next_month(month: date) -> date:
+    return (month.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def _columns(rows: list, fields: list) -> dict:
+    return {field: [row[field] for row in rows] for field in fields}
+
+
+def _rows(columns: dict, fields: list) -> list:
+    return [dict(zip(fields, values)) for values in zip(*(columns[field] for field in fields))]
+
+
+def archive_month(user, month: date):
+    """
+    Move one month of the user's hot sessions into its archive row (merging with
+    anything archived for that month before). A hot session on a date that
+    already has an archived session is merged into it, entries and all, so a
+    month never lists the same day twice. Call within the user's schema
+    context. Returns (sessions, entries) moved.
+    """
+    # analytics reads archives through this module
+    from base.utils.analytics import invalidate_analytics
+
+    end = _next_month(month)
+    with transaction.atomic():
+        sessions = list(
+            Session.objects.select_for_update()
+            .filter(user=user, date__gte=month, date__lt=end)
+            .order_by('date', 'id')
+            .values(*SESSION_FIELDS)
+        )
+        if not sessions:
+            return 0, 0
+        session_ids = [s['id'] for s in sessions]
+        entries = list(
+            SessionEntry.objects.filter(session_id__in=session_ids).order_by('id').values(*ENTRY_FIELDS)
+        )
+        for session in sessions:
+            session['date'] = session['date'].isoformat()
+
+        archive, _ = SessionArchive.objects.select_for_update().get_or_create(
+            user=user, month=month,
+            defaults={'payload': {'sessions': _columns([], SESSION_FIELDS), 'entries': _columns([], ENTRY_FIELDS)}},
+        )
+        archived_sessions = _rows(archive.payload['sessions'], SESSION_FIELDS)
+        session_for_date = {s['date']: s['id'] for s in archived_sessions}
+        merged_into = {}
+        for session in sessions:
+            existing = session_for_date.setdefault(session['date'], session['id'])
+            if existing == session['id']:
+                archived_sessions.append(session)
+            else:
+                merged_into[session['id']] = existing
+        for entry in entries:
+            entry['session_id'] = merged_into.get(entry['session_id'], entry['session_id'])
+        archived_entries = _rows(archive.payload['entries'], ENTRY_FIELDS) + entries
+        archive.payload = {
+            'sessions': _columns(archived_sessions, SESSION_FIELDS),
+            'entries': _columns(archived_entries, ENTRY_FIELDS),
+        }
+        archive.session_count = len(archived_sessions)
+        archive.entry_count = len(archived_entries)
+        archive.save()
+
+        SessionEntry.objects.filter(session_id__in=session_ids).delete()
+        Session.objects.filter(id__in=session_ids).delete()
+        invalidate_analytics(user.id)
+    return len(sessions), len(entries)
+
+
+def archive_user_history(user, horizon_days: int):
+    """
+    Archive every whole month of the user's hot history older than the horizon.
+    Incremental: only months that still have hot sessions are touched, so
+    re-running is cheap. Returns (months, sessions, entries) archived.
+    """
+    cutoff = archive_cutoff(horizon_days)
+    months = sessions_moved = entries_moved = 0
+    with user_schema_context(user):
+        while True:
+            oldest = Session.objects.filter(user=user, date__lt=cutoff).aggregate(oldest=Min('date'))['oldest']
+            if oldest is None:
+                break
+            moved_sessions, moved_entries = archive_month(user, oldest.replace(day=1))
+            months += 1
+            sessions_moved += moved_sessions
+            entries_moved += moved_entries
+    return months, sessions_moved, entries_moved
+
+
+def _archives_between(user, date_from=None, date_to=None):
+    """Archive rows overlapping [date_from, date_to] (as ISO strings or dates), oldest first"""
+    queryset = SessionArchive.objects.filter(user=user).order_by('month')
+    if date_from:
+        queryset = queryset.filter(month__gte=date.fromisoformat(str(date_from)).replace(day=1))
+    if date_to:
+        queryset = queryset.filter(month__lte=date_to)
+    return queryset
+
+
+def archived_sessions(user, params) -> list:
+    """
+    Archived sessions matching the session list params (date_from, date_to,
+    exercise_id, muscle_group_id), shaped like SessionDetailSerializer output.
+    Call within the user's schema context.
+    """
+    from api.serialisers import ExerciseDetailSerializer
+
+    date_from, date_to = params.get('date_from'), params.get('date_to')
+    archives = list(_archives_between(user, date_from, date_to).values_list('payload', flat=True))
+    if not archives:
+        return []
+
+    sessions, entries = [], []
+    for payload in archives:
+        sessions += _rows(payload['sessions'], SESSION_FIELDS)
+        entries += _rows(payload['entries'], ENTRY_FIELDS)
+    if date_from:
+        sessions = [s for s in sessions if s['date'] >= str(date_from)]
+    if date_to:
+        sessions = [s for s in sessions if s['date'] <= str(date_to)]
+
+    exercises = {
+        exercise.id: exercise
+        for exercise in Exercise.objects.select_related('muscle_group', 'exercise_type')
+        .filter(id__in={e['exercise_id'] for e in entries})
+    }
+    exercise_data = {
+        exercise_id: data
+        for exercise_id, data in zip(exercises, ExerciseDetailSerializer(exercises.values(), many=True).data)
+    }
+    for exercise_id in {e['exercise_id'] for e in entries} - exercises.keys():
+        exercise_data[exercise_id] = deleted_exercise(exercise_id)
+    entries_by_session = {}
+    for entry in entries:
+        entries_by_session.setdefault(entry['session_id'], []).append(entry)
+
+    exercise_id = params.get('exercise_id')
+    muscle_group_id = params.get('muscle_group_id')
+    result = []
+    for session in sessions:
+        session_entries = entries_by_session.get(session['id'], [])
+        if exercise_id and not any(str(e['exercise_id']) == str(exercise_id) for e in session_entries):
+            continue
+        if muscle_group_id and not any(
+            e['exercise_id'] in exercises
+            and str(exercises[e['exercise_id']].muscle_group_id) == str(muscle_group_id)
+            for e in session_entries
+        ):
+            continue
+        result.append({
+            **session,
+            'session_entries': [
+                {
+                    'id': e['id'],
+                    'exercise': exercise_data[e['exercise_id']],
+                    'weight': e['weight'],
+                    'status': e['status'],
+                }
+                for e in session_entries
+            ],
+        })
+    return result
+
+
+def deleted_exercise(exercise_id) -> dict:
+    """Stand-in for ExerciseDetailSerializer output when an archived entry's exercise is gone"""
+    return {
+        'id': exercise_id,
+        'exercise_name': DELETED_EXERCISE_NAME,
+        'exercise_name_legacy': '',
+        'muscle_group': None,
+        'exercise_type': None,
+    }
+
+
+def archived_entry_rows(user):
+    """
+    (date, exercise_id, weight, status) for every archived entry, oldest first.
+    Call within the user's schema context.
+    """
+    for payload in _archives_between(user).values_list('payload', flat=True).iterator():
+        dates = {s['id']: s['date'] for s in _rows(payload['sessions'], SESSION_FIELDS)}
+        for entry in sorted(_rows(payload['entries'], ENTRY_FIELDS), key=lambda e: (dates[e['session_id']], e['id'])):
+            yield dates[entry['session_id']], entry['exercise_id'], entry['weight'], entry['status']
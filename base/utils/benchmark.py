@@ -0,0 +1,56 @@
+import time
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def timed_request(client, method, url, **kwargs):
+    """
+    Issue one request through a django.test.Client.
+    Returns (response, elapsed_ms, query_count).
+    """
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        response = getattr(client, method)(url, **kwargs)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+    return response, elapsed_ms, len(queries.captured_queries)
+
+
+def summarize(latencies, query_counts, payload_sizes):
+    """Collapse per-request samples into the numbers reported and stored in baselines"""
+    latencies = sorted(latencies)
+    return {
+        'n': len(latencies),
+        'p50_ms': round(percentile(latencies, 50), 3),
+        'p95_ms': round(percentile(latencies, 95), 3),
+        'p99_ms': round(percentile(latencies, 99), 3),
+        'queries': max(query_counts) if query_counts else 0,
+        'payload_bytes': max(payload_sizes) if payload_sizes else 0,
+    }
+
+
+def find_regressions(results, baseline, threshold, min_delta_ms):
+    """
+    Compare results with a stored baseline.
+
+    An endpoint regresses when its p95 grows by more than threshold (a fraction)
+    and by at least min_delta_ms, or when it issues more queries than before.
+    """
+    regressions = []
+    for key, current in results.items():
+        previous = baseline.get(key)
+        if previous is None:
+            continue
+        delta = current['p95_ms'] - previous['p95_ms']
+        if delta > min_delta_ms and current['p95_ms'] > previous['p95_ms'] * (1 + threshold):
+            regressions.append(f"{key}: p95 {previous['p95_ms']:.1f}ms -> {current['p95_ms']:.1f}ms")
+        if current['queries'] > previous['queries']:
+            regressions.append(f"{key}: queries {previous['queries']} -> {current['queries']}")
+    return regressions
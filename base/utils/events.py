@@ -0,0 +1,144 @@
+"""
+Live change events for a user's sessions and entries.
+
+Write paths call publish_event(); once the transaction commits the event is sent
+with pg_notify on a single channel, so every process serving /api/events/ (on
+any host) hears it. In each ASGI process one EventBroker holds a LISTEN
+connection, registered with the event loop via add_reader, and fans events out
+to the asyncio queues of that user's open streams. The connection is opened in
+a worker thread (with a timeout), so a slow or unreachable database never
+blocks the event loop.
+"""
+import asyncio
+import json
+import weakref
+import psycopg2
+from django.conf import settings
+from django.db import connection, transaction
+
+CHANNEL = 'tenant_events'
+# pg_notify payloads must stay under 8000 bytes; larger events are sent without data
+MAX_PAYLOAD_BYTES = 7900
+# Events buffered per stream before the client is told to resync instead
+QUEUE_SIZE = 100
+RECONNECT_SECONDS = 2
+CONNECT_TIMEOUT_SECONDS = 5
+# DATABASES OPTIONS that Django handles itself rather than passing on to libpq
+DJANGO_ONLY_OPTIONS = {'assume_role', 'isolation_level', 'pool', 'server_side_binding', 'prepare_threshold'}
+
+
+def publish_event(user_id, event_type, data=None):
+    """Notify user_id's open event streams after the current transaction commits"""
+    payload = json.dumps({'user_id': user_id, 'type': event_type, 'data': data}, default=str)
+    if len(payload.encode()) > MAX_PAYLOAD_BYTES:
+        payload = json.dumps({'user_id': user_id, 'type': event_type, 'data': None})
+
+    def notify():
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s);", [CHANNEL, payload])
+
+    transaction.on_commit(notify)
+
+
+def listen_connection():
+    """A new autocommit connection to the default database, LISTENing on CHANNEL (blocking)"""
+    db = settings.DATABASES['default']
+    params = {key: value for key, value in db.get('OPTIONS', {}).items() if key not in DJANGO_ONLY_OPTIONS}
+    params.setdefault('connect_timeout', CONNECT_TIMEOUT_SECONDS)
+    conn = psycopg2.connect(
+        dbname=db['NAME'], user=db['USER'], password=db['PASSWORD'],
+        host=db['HOST'], port=db['PORT'], **params,
+    )
+    try:
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f"LISTEN {CHANNEL};")
+    except psycopg2.Error:
+        conn.close()
+        raise
+    return conn
+
+
+class EventBroker:
+    """Per-event-loop LISTEN connection fanning notifications out to subscriber queues"""
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.subscribers = {}
+        self.conn = None
+        self._connecting = None
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        self.subscribers.setdefault(user_id, set()).add(queue)
+        if self.conn is None and self._connecting is None:
+            self._connecting = self.loop.create_task(self._connect())
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        queues = self.subscribers.get(user_id)
+        if queues:
+            queues.discard(queue)
+            if not queues:
+                del self.subscribers[user_id]
+
+    async def _connect(self, delay=0):
+        """Open the LISTEN connection in a worker thread, retrying every RECONNECT_SECONDS"""
+        try:
+            await asyncio.sleep(delay)
+            while True:
+                try:
+                    conn = await self.loop.run_in_executor(None, listen_connection)
+                    break
+                except psycopg2.Error:
+                    await asyncio.sleep(RECONNECT_SECONDS)
+            self.conn = conn
+            self.loop.add_reader(conn.fileno(), self._on_readable)
+        finally:
+            self._connecting = None
+
+    def _on_readable(self):
+        try:
+            self.conn.poll()
+        except psycopg2.Error:
+            # Lost the connection: events may have been missed, so everyone refetches
+            self.loop.remove_reader(self.conn.fileno())
+            self.conn.close()
+            self.conn = None
+            self._broadcast_resync()
+            self._connecting = self.loop.create_task(self._connect(delay=RECONNECT_SECONDS))
+            return
+        while self.conn.notifies:
+            notify = self.conn.notifies.pop(0)
+            try:
+                event = json.loads(notify.payload)
+            except ValueError:
+                continue
+            for queue in list(self.subscribers.get(event.pop('user_id', None), ())):
+                self._deliver(queue, event)
+
+    def _broadcast_resync(self):
+        for queues in self.subscribers.values():
+            for queue in queues:
+                self._deliver(queue, {'type': 'resync', 'data': None})
+
+    def _deliver(self, queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # Slow client: drop what it has not read and make it reload instead
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait({'type': 'resync', 'data': None})
+
+
+_brokers = weakref.WeakKeyDictionary()
+
+
+def get_broker():
+    """The EventBroker for the running event loop"""
+    loop = asyncio.get_running_loop()
+    broker = _brokers.get(loop)
+    if broker is None:
+        broker = _brokers[loop] = EventBroker(loop)
+    return broker
@@ -0,0 +1,139 @@
+"""
+Fuzzy matching of legacy exercise names against the legacy exercise catalog.
+
+Names are canonicalised (normalize() from exercise_search, abbreviations and
+spelling variants mapped to one form, plurals folded) and looked up in a
+trigram index over the catalog, so each name is only scored against the
+catalog entries it shares the most trigrams with. Matching works on the unique
+names, not the session rows.
+
+A match is accepted when its score reaches the threshold and beats the next
+best catalog entry by a clear margin; everything else is left for review.
+"""
+import heapq
+from collections import Counter
+import pandas as pd
+from base.utils.exercise_search import normalize, trigrams
+
+# Bump whenever canonical(), SYNONYMS or the scoring change which names match
+# (cached legacy imports are keyed on it, see legacy_cache)
+MATCHER_VERSION = 1
+
+# Accept a match at or above this score...
+MATCH_THRESHOLD = 0.8
+# ...when the runner-up scores at least this much less (e.g. same exercise, other type)
+MATCH_MARGIN = 0.05
+# Candidates (by shared trigram count) fully scored per name
+MATCH_CANDIDATES = 20
+
+# Abbreviations and spelling variants, applied to each word of both sides
+SYNONYMS = {
+    'db': 'dumbell', 'dbs': 'dumbell', 'dumbbell': 'dumbell', 'dumbbells': 'dumbell',
+    'bb': 'barbell', 'kb': 'kettlebell',
+    'lat': 'lateral', 'lats': 'lateral',
+    'pulldown': 'pull down', 'pushdown': 'push down',
+    'chinup': 'chin up', 'chinups': 'chin up', 'pullup': 'pull up', 'pullups': 'pull up',
+    'tri': 'tricep', 'triceps': 'tricep', 'bi': 'bicep', 'biceps': 'bicep',
+    'ext': 'extension', 'incl': 'incline', 'decl': 'decline',
+    'ohp': 'overhead press', 'rdl': 'romanian deadlift',
+    'flies': 'fly', 'kickback': 'kick back', 'kickbacks': 'kick back',
+}
+
+REVIEW_COLUMNS = ['legacy_name', 'rows', 'best_match', 'best_score', 'runner_up', 'runner_up_score']
+
+
+def canonical(name: str) -> str:
+    """normalize(), then expand synonyms and drop plural "s" so variants compare equal"""
+    words = []
+    for word in normalize(name).split():
+        word = SYNONYMS.get(word, word)
+        for part in word.split():
+            if len(part) > 3 and part.endswith('s') and not part.endswith('ss'):
+                part = part[:-1]
+            words.append(part)
+    return ' '.join(words)
+
+
+class ExerciseMatcher:
+    """
+    Trigram postings over the catalog's "<exercise> <exercise_type>" names.
+
+    Scores combine word overlap (Dice) with trigram similarity (Jaccard), so
+    word order and small spelling differences both cost little.
+    """
+
+    def __init__(self, exercise_data: pd.DataFrame):
+        catalog = exercise_data.fillna('')
+        self.rows = list(catalog[['exercise', 'exercise_type', 'MuscleGroup']].itertuples(index=False, name=None))
+        self.words = []
+        self.grams = []
+        self.postings = {}
+        for position, (exercise, exercise_type, _) in enumerate(self.rows):
+            name = canonical(f'{exercise} {exercise_type}')
+            grams = trigrams(name)
+            self.words.append(set(name.split()))
+            self.grams.append(grams)
+            for gram in grams:
+                self.postings.setdefault(gram, []).append(position)
+
+    def _score(self, words: set, grams: set, position: int) -> float:
+        name_words = self.words[position]
+        name_grams = self.grams[position]
+        word_score = 2 * len(words & name_words) / (len(words) + len(name_words))
+        overlap = len(grams & name_grams)
+        gram_score = overlap / (len(grams) + len(name_grams) - overlap)
+        return 0.5 * word_score + 0.5 * gram_score
+
+    def best_matches(self, name: str):
+        """[(score, position), ...] for the two best catalog entries (fewer if nothing shares a trigram)"""
+        normalized = canonical(name)
+        grams = trigrams(normalized)
+        if not grams:
+            return []
+        hits = Counter()
+        for gram in grams:
+            hits.update(self.postings.get(gram, ()))
+        candidates = heapq.nlargest(MATCH_CANDIDATES, hits.items(), key=lambda item: item[1])
+
+        words = set(normalized.split())
+        # The same exercise/type pair can appear more than once in the catalog
+        best = {}
+        for position, _ in candidates:
+            key = self.rows[position][:2]
+            score = self._score(words, grams, position)
+            if key not in best or score > best[key][0]:
+                best[key] = (score, position)
+        return heapq.nlargest(2, best.values(), key=lambda item: (item[0], -item[1]))
+
+    def match(self, names: pd.Series, threshold: float = MATCH_THRESHOLD, margin: float = MATCH_MARGIN):
+        """
+        Match the unique values of names.
+
+        Returns (resolved, review): resolved maps a name to (exercise,
+        exercise_type, MuscleGroup); review is a DataFrame of the names left
+        unresolved with their best candidates, most frequent first.
+        """
+        resolved = {}
+        review = []
+        for name, rows in names.value_counts().items():
+            matches = self.best_matches(name)
+            score, position = matches[0] if matches else (0.0, None)
+            runner_up_score, runner_up = matches[1] if len(matches) > 1 else (0.0, None)
+            if position is not None and score >= threshold and score - runner_up_score >= margin:
+                resolved[name] = self.rows[position]
+                continue
+            review.append((
+                name,
+                rows,
+                self._label(position),
+                round(score, 3),
+                self._label(runner_up),
+                round(runner_up_score, 3),
+            ))
+        return resolved, pd.DataFrame(review, columns=REVIEW_COLUMNS)
+
+    def _label(self, position) -> str:
+        if position is None:
+            return ''
+        exercise, exercise_type, _ = self.rows[position]
+        return f'{exercise} - {exercise_type}' if exercise_type else exercise
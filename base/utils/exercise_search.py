@@ -0,0 +1,159 @@
+"""
+In-memory n-gram index over the exercise catalog for type-ahead suggestions.
+
+The index is built once per process and rebuilt only when the catalog version
+(bumped by signals after a transaction saving or deleting an exercise, muscle
+group or exercise type commits) changes. The version lives in the shared
+default cache, so an edit handled by one process invalidates every process.
+"""
+import heapq
+import re
+import threading
+from collections import Counter
+from django.core.cache import cache
+
+CATALOG_VERSION_KEY = 'exercise_catalog_version'
+# Candidates (by shared trigram count) fully scored per requested result
+CANDIDATES_PER_RESULT = 4
+
+_NON_ALNUM = re.compile(r'[^a-z0-9]+')
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse everything but letters and digits to single spaces"""
+    return _NON_ALNUM.sub(' ', str(text).lower()).strip()
+
+
+def trigrams(normalized: str) -> set:
+    """
+    Character trigrams of each word, padded like pg_trgm ("  w", " wo", ...),
+    so short prefixes still produce grams that anchor at the start of a word.
+    """
+    grams = set()
+    for word in normalized.split():
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def catalog_version():
+    """Current catalog version (initialised on first use)"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, 1, timeout=None)
+        version = cache.get(CATALOG_VERSION_KEY, 1)
+    return version
+
+
+def bump_catalog_version():
+    """Invalidate every process's suggestion index"""
+    try:
+        cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        cache.set(CATALOG_VERSION_KEY, 2, timeout=None)
+
+
+class ExerciseSearchIndex:
+    """
+    Trigram postings over exercise name, legacy name, type and muscle group.
+
+    Candidates are gathered from the postings of the query's trigrams only, then
+    ranked by how much of the query they cover, their similarity to the
+    exercise name, and word-prefix matches.
+    """
+
+    def __init__(self, documents):
+        # documents: list of (payload, muscle_group_id, name, search_text)
+        self.payloads = []
+        self.muscle_group_ids = []
+        self.names = []
+        self.name_words = []
+        self.name_grams = []
+        self.postings = {}
+        for position, (payload, muscle_group_id, name, search_text) in enumerate(documents):
+            normalized_name = normalize(name)
+            self.payloads.append(payload)
+            self.muscle_group_ids.append(muscle_group_id)
+            self.names.append(normalized_name)
+            self.name_words.append(normalize(search_text).split())
+            self.name_grams.append(trigrams(normalized_name))
+            for gram in trigrams(normalize(search_text)):
+                self.postings.setdefault(gram, []).append(position)
+
+    def search(self, query: str, limit: int = 10, muscle_group_id=None) -> list:
+        normalized = normalize(query)
+        if not normalized:
+            # No query: list the (optionally filtered) catalog alphabetically
+            positions = [
+                p for p in range(len(self.payloads))
+                if muscle_group_id is None or self.muscle_group_ids[p] == muscle_group_id
+            ]
+            positions.sort(key=lambda p: self.names[p])
+            return [dict(self.payloads[p], score=0.0) for p in positions[:limit]]
+
+        query_grams = trigrams(normalized)
+        query_words = normalized.split()
+        hits = Counter()
+        for gram in query_grams:
+            hits.update(self.postings.get(gram, ()))
+
+        if muscle_group_id is not None:
+            hits = {p: n for p, n in hits.items() if self.muscle_group_ids[p] == muscle_group_id}
+        # Only fully score the candidates sharing the most trigrams with the query
+        candidates = heapq.nlargest(limit * CANDIDATES_PER_RESULT, hits.items(), key=lambda item: item[1])
+
+        scored = []
+        for position, shared in candidates:
+            coverage = shared / len(query_grams)
+            name_grams = self.name_grams[position]
+            overlap = len(query_grams & name_grams)
+            similarity = overlap / (len(query_grams) + len(name_grams) - overlap)
+            words = self.name_words[position]
+            prefix_matches = sum(any(w.startswith(q) for w in words) for q in query_words) / len(query_words)
+            score = 0.5 * coverage + 0.3 * similarity + 0.2 * prefix_matches
+            if self.names[position].startswith(normalized):
+                score += 0.25
+            scored.append((score, position))
+
+        best = heapq.nlargest(limit, scored, key=lambda item: (item[0], -item[1]))
+        return [dict(self.payloads[p], score=round(score, 4)) for score, p in best]
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> ExerciseSearchIndex:
+    """Return this process's index, rebuilding it if the catalog version moved on"""
+    global _index, _index_version
+    version = catalog_version()
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                _index = _build_index()
+                _index_version = version
+    return _index
+
+
+def _build_index() -> ExerciseSearchIndex:
+    from base.models import Exercise
+    from api.serialisers import ExerciseDetailSerializer
+
+    exercises = Exercise.objects.select_related('muscle_group', 'exercise_type')
+    documents = []
+    for exercise in exercises:
+        type_name = exercise.exercise_type.type_name if exercise.exercise_type else ''
+        search_text = ' '.join((
+            exercise.exercise_name,
+            exercise.exercise_name_legacy,
+            type_name,
+            exercise.muscle_group.muscle_group_name,
+        ))
+        documents.append((
+            ExerciseDetailSerializer(exercise).data,
+            exercise.muscle_group_id,
+            exercise.exercise_name,
+            search_text,
+        ))
+    return ExerciseSearchIndex(documents)
@@ -0,0 +1,118 @@
+"""
+On-disk cache of normalised legacy session data.
+
+combine_exercises() output is stored as an Arrow IPC file named after a SHA-256
+of the session and exercise CSVs and the exercise matcher's version and
+parameters, so re-importing unchanged files skips CSV parsing and matching.
+Cached files are memory mapped and their columns wrapped (pd.ArrowDtype)
+rather than copied into NumPy arrays. Only the LEGACY_CACHE_MAX_ENTRIES most
+recently used entries are kept.
+
+pyarrow is optional: without it, or with LEGACY_CACHE_DIR = None, every call
+just rebuilds the data.
+"""
+import hashlib
+import os
+import shutil
+import tempfile
+import pandas as pd
+from django.conf import settings
+from base.utils.exercise_matching import MATCHER_VERSION, MATCH_THRESHOLD, MATCH_MARGIN, MATCH_CANDIDATES
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+# Bump when combine_exercises changes what it produces (the matcher has MATCHER_VERSION)
+CACHE_FORMAT = 1
+HASH_CHUNK_BYTES = 1 << 20
+DEFAULT_MAX_ENTRIES = 20
+
+
+def cache_dir():
+    """Configured cache directory, or None when caching is off or pyarrow is missing"""
+    directory = getattr(settings, 'LEGACY_CACHE_DIR', None)
+    if pa is None or not directory:
+        return None
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def cache_key(*paths) -> str:
+    """SHA-256 over the cache format, the matcher's version and parameters, and the contents of each file"""
+    digest = hashlib.sha256(
+        f'legacy-v{CACHE_FORMAT}:matcher-v{MATCHER_VERSION}:'
+        f'{MATCH_THRESHOLD}:{MATCH_MARGIN}:{MATCH_CANDIDATES}'.encode()
+    )
+    for path in paths:
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b''):
+                digest.update(chunk)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def cached_frame(paths: list, build, review_path: str = None):
+    """
+    Return build(review_file) from the cache entry for the files at paths,
+    calling it (and storing its DataFrame) on a miss.
+
+    build takes the path its review file should be written to, if any; that
+    file is cached alongside the data and copied to review_path on every call.
+    """
+    directory = cache_dir()
+    if directory is None:
+        return build(review_path)
+
+    key = cache_key(*paths)
+    data_file = os.path.join(directory, f'{key}.arrow')
+    review_file = os.path.join(directory, f'{key}_unmatched.csv')
+    if os.path.exists(data_file):
+        # Mark the entry as recently used for eviction
+        os.utime(data_file)
+    else:
+        _write(build(review_file), data_file)
+        _evict(directory, getattr(settings, 'LEGACY_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES))
+    if review_path and os.path.exists(review_file):
+        shutil.copyfile(review_file, review_path)
+    # Read back even after a miss, so callers always get the same (Arrow-backed) dtypes
+    return _read(data_file)
+
+
+def _evict(directory, max_entries):
+    """Delete all but the max_entries most recently used entries (data and review files)"""
+    entries = []
+    for name in os.listdir(directory):
+        if name.endswith('.arrow'):
+            try:
+                entries.append((os.path.getmtime(os.path.join(directory, name)), name[:-len('.arrow')]))
+            except FileNotFoundError:
+                # Evicted by a concurrent importer
+                continue
+    entries.sort(reverse=True)
+    for _, key in entries[max_entries:]:
+        for name in (f'{key}.arrow', f'{key}_unmatched.csv'):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+
+
+def _read(path):
+    source = pa.memory_map(path, 'r')
+    table = pa.ipc.open_file(source).read_all()
+    return table.to_pandas(types_mapper=pd.ArrowDtype)
+
+
+def _write(frame, path):
+    table = pa.Table.from_pandas(frame, preserve_index=False)
+    # Write next to the target and rename, so concurrent importers never read a partial file
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
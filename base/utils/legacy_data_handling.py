@@ -1,6 +1,7 @@
 import pandas as pd
+from base.utils.exercise_matching import ExerciseMatcher
 
-def combine_exercises(session_data:pd.DataFrame, exercise_data:pd.DataFrame, save_dir:str=None) -> pd.DataFrame:
+def combine_exercises(session_data:pd.DataFrame, exercise_data:pd.DataFrame, save_dir:str=None, review_path:str=None) -> pd.DataFrame:
     exercise_data["full_name"] = exercise_data["exercise"] + " - " + exercise_data["exercise_type"]
 
     # Merge session data with exercises twice:
@@ -14,6 +15,17 @@ def combine_exercises(session_data:pd.DataFrame, exercise_data:pd.DataFrame, sav
         exercise_type=sdata_comb['exercise_type'].fillna(sdata_comb['exercise_type_full']),
         MuscleGroup=sdata_comb['MuscleGroup'].fillna(sdata_comb['MuscleGroup_full'])
     )[["Date", "Exercise", "exercise_type", "MuscleGroup", "Result", "Weight", "Status"]]
+    # Fuzzy match names neither merge resolved; unresolved rows keep a NaN MuscleGroup
+    unmatched = sdata_comb["MuscleGroup"].isna()
+    if unmatched.any():
+        resolved, review = ExerciseMatcher(exercise_data).match(sdata_comb.loc[unmatched, "Exercise"])
+        matched = unmatched & sdata_comb["Exercise"].isin(resolved.keys())
+        names = sdata_comb.loc[matched, "Exercise"]
+        sdata_comb.loc[matched, "exercise_type"] = names.map(lambda name: resolved[name][1] or None)
+        sdata_comb.loc[matched, "MuscleGroup"] = names.map(lambda name: resolved[name][2])
+        sdata_comb.loc[matched, "Exercise"] = names.map(lambda name: resolved[name][0])
+        if review_path and len(review):
+            review.to_csv(review_path, index=False)
     # Append exercise type to Exercise name if it's not already there
     sdata_comb = sdata_comb.assign(
         Exercise=sdata_comb.apply(
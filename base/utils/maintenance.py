@@ -0,0 +1,112 @@
+"""
+Targeted ANALYZE/VACUUM for tenant tables.
+
+Autovacuum's thresholds (50 rows + a fraction of the table) rarely fire on the
+many small per-tenant tables, and bulk imports leave them without statistics.
+find_maintenance_tasks() picks the tables that need attention from
+pg_stat_user_tables and run_maintenance() processes them with a bounded
+number of parallel connections. A table that fails (dropped since it was
+listed, not owned by the role, ...) is logged and skipped.
+"""
+import logging
+from dataclasses import dataclass
+from django.db import DatabaseError, connection
+from base.utils.tenancy import SHARED_SCHEMA, get_tenancy_backend
+from base.utils.user_context import TenantThreadPoolExecutor
+
+# Tenant schemas, plus the shared-table backend's partitions
+TENANT_SCHEMA_PATTERN = f'^(user_[0-9]+|{SHARED_SCHEMA})$'
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MaintenanceTask:
+    schema: str
+    table: str
+    # 'ANALYZE' or 'VACUUM (ANALYZE)'
+    action: str
+    reason: str
+
+    @property
+    def qualified_name(self):
+        return f'"{self.schema}"."{self.table}"'
+
+    def sql(self):
+        return f"{self.action} {self.qualified_name};"
+
+
+def find_maintenance_tasks(min_changes=50, change_ratio=0.1, dead_ratio=0.2, schemas=None) -> list:
+    """
+    Tenant tables that need fresh statistics or a vacuum:
+
+    - ANALYZE: never analyzed, or at least max(min_changes, change_ratio * live rows)
+      rows modified since the last analyze
+    - VACUUM (ANALYZE): at least max(min_changes, dead_ratio * live rows) dead rows
+    """
+    schema_filter = "schemaname = ANY(%s)" if schemas else "schemaname ~ %s"
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"""
+                SELECT schemaname, relname, n_live_tup, n_dead_tup, n_mod_since_analyze,
+                       coalesce(last_analyze, last_autoanalyze) IS NULL AS never_analyzed
+                FROM pg_stat_user_tables
+                WHERE {schema_filter}
+                ORDER BY schemaname, relname;
+            """,
+            [list(schemas) if schemas else TENANT_SCHEMA_PATTERN],
+        )
+        rows = cursor.fetchall()
+
+    tasks = []
+    for schema, table, live, dead, modified, never_analyzed in rows:
+        if dead >= max(min_changes, dead_ratio * live):
+            tasks.append(MaintenanceTask(schema, table, 'VACUUM (ANALYZE)', f'{dead} dead of {live} rows'))
+        elif never_analyzed and (live or modified):
+            tasks.append(MaintenanceTask(schema, table, 'ANALYZE', 'never analyzed'))
+        elif modified >= max(min_changes, change_ratio * live):
+            tasks.append(MaintenanceTask(schema, table, 'ANALYZE', f'{modified} changes of {live} rows'))
+    return tasks
+
+
+def _run_batch(tasks):
+    """Run tasks one after the other; returns the ones that failed"""
+    failed = []
+    # VACUUM cannot run in a transaction block; connections are in autocommit here,
+    # so a failing statement doesn't affect the rest of the batch
+    with connection.cursor() as cursor:
+        for task in tasks:
+            try:
+                cursor.execute(task.sql())
+            except DatabaseError:
+                logger.exception("%s failed", task.sql())
+                failed.append(task)
+    return failed
+
+
+def run_maintenance(tasks, workers=4):
+    """
+    Run tasks over at most `workers` concurrent connections.
+    Returns (tasks that succeeded, tasks that failed).
+    """
+    if not tasks:
+        return [], []
+    workers = max(1, min(workers, len(tasks)))
+    # One batch per worker so each uses a single connection for all of its tables
+    batches = [tasks[i::workers] for i in range(workers)]
+    with TenantThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_run_batch, batch) for batch in batches]
+        failed = [task for future in futures for task in future.result()]
+    return [task for task in tasks if task not in failed], failed
+
+
+def analyze_tenant(user_id) -> None:
+    """Refresh statistics for one tenant's tables, e.g. after a bulk import"""
+    with connection.cursor() as cursor:
+        # Schemas created before a table was added don't have it until sync_tenant_schemas runs
+        cursor.execute(
+            "SELECT name FROM unnest(%s::text[]) AS name WHERE to_regclass(name) IS NOT NULL;",
+            [get_tenancy_backend().tenant_tables(user_id)],
+        )
+        for (table,) in cursor.fetchall():
+            cursor.execute(f"ANALYZE {table};")
@@ -0,0 +1,183 @@
+import time
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Histogram bucket upper bounds (Prometheus "le" labels)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 250, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+_current_request_metrics = ContextVar('current_request_metrics', default=None)
+
+
+class RequestMetrics:
+    """Counters collected over the lifetime of a single request"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.query_count = 0
+        self.sql_time = 0.0
+        self.search_path_switches = 0
+        self.sections = {}
+
+    def add_section(self, name, elapsed):
+        self.sections[name] = self.sections.get(name, 0.0) + elapsed
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting queries, SQL time and search_path switches.
+    Install with connection.execute_wrapper(QueryRecorder(metrics)).
+    """
+
+    def __init__(self, metrics):
+        self.metrics = metrics
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.metrics.query_count += 1
+            self.metrics.sql_time += time.perf_counter() - start
+            if sql.lstrip()[:15].upper() == 'SET SEARCH_PATH':
+                self.metrics.search_path_switches += 1
+
+
+def current_request_metrics():
+    """Return the RequestMetrics of the request being handled, if any"""
+    return _current_request_metrics.get()
+
+
+@contextmanager
+def track_request(metrics):
+    """Make metrics the current request's metrics for the duration of the block"""
+    token = _current_request_metrics.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _current_request_metrics.reset(token)
+
+
+@contextmanager
+def time_section(name):
+    """
+    Time a named section of the current request (e.g. 'serialize').
+    Does nothing outside an instrumented request.
+    """
+    metrics = _current_request_metrics.get()
+    if metrics is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics.add_section(name, time.perf_counter() - start)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class MetricsRegistry:
+    """
+    Per-process aggregation of request metrics keyed by (endpoint, method).
+
+    Each worker process keeps its own registry, so a scrape reflects the worker
+    that served it. Observations only touch a few integers under a lock, which
+    keeps the overhead small enough to leave enabled in production.
+    """
+    HISTOGRAMS = {
+        'http_request_duration_seconds': ('Total request latency', LATENCY_BUCKETS),
+        'http_request_sql_seconds': ('Time spent executing SQL per request', LATENCY_BUCKETS),
+        'http_request_serialize_seconds': ('Time spent serializing per request', LATENCY_BUCKETS),
+        'http_request_render_seconds': ('Time spent rendering the response', LATENCY_BUCKETS),
+        'http_request_queries': ('SQL queries executed per request', QUERY_COUNT_BUCKETS),
+        'http_response_size_bytes': ('Response body size', SIZE_BUCKETS),
+    }
+    COUNTERS = {
+        'http_request_search_path_switches_total': 'SET search_path statements executed',
+        'http_requests_rejected_total': 'Requests rejected by throttles or load shedding',
+    }
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+
+    def observe(self, name, labels, value):
+        key = (name, labels)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = Histogram(self.HISTOGRAMS[name][1])
+            histogram.observe(value)
+
+    def increment(self, name, labels, amount=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def record_request(self, endpoint, method, metrics, total, render, size):
+        labels = (('endpoint', endpoint), ('method', method))
+        self.observe('http_request_duration_seconds', labels, total)
+        self.observe('http_request_sql_seconds', labels, metrics.sql_time)
+        self.observe('http_request_serialize_seconds', labels, metrics.sections.get('serialize', 0.0))
+        self.observe('http_request_render_seconds', labels, render)
+        self.observe('http_request_queries', labels, metrics.query_count)
+        if size is not None:
+            self.observe('http_response_size_bytes', labels, size)
+        self.increment('http_request_search_path_switches_total', labels, metrics.search_path_switches)
+
+    def render_prometheus(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        with self._lock:
+            histograms = {key: (list(h.counts), h.sum, h.count, h.buckets) for key, h in self._histograms.items()}
+            counters = dict(self._counters)
+
+        lines = []
+        for name, (description, _) in self.HISTOGRAMS.items():
+            series = sorted((labels, data) for (metric, labels), data in histograms.items() if metric == name)
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} histogram')
+            for labels, (counts, total, count, buckets) in series:
+                cumulative = 0
+                for bound, bucket_count in zip(buckets, counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{{_format_labels(labels, le=bound)}}} {cumulative}')
+                lines.append(f'{name}_bucket{{{_format_labels(labels, le="+Inf")}}} {count}')
+                lines.append(f'{name}_sum{{{_format_labels(labels)}}} {total}')
+                lines.append(f'{name}_count{{{_format_labels(labels)}}} {count}')
+        for name, description in self.COUNTERS.items():
+            series = sorted((labels, value) for (metric, labels), value in counters.items() if metric == name)
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} counter')
+            for labels, value in series:
+                lines.append(f'{name}{{{_format_labels(labels)}}} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels, **extra):
+    pairs = list(labels) + list(extra.items())
+    return ','.join(f'{key}="{_escape_label(value)}"' for key, value in pairs)
+
+
+def _escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+registry = MetricsRegistry()
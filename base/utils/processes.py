@@ -0,0 +1,16 @@
+"""
+Helpers for code that runs in child processes (job workers, seeding pools).
+
+Processes may be spawned rather than forked, in which case they start without
+Django set up; init_worker() takes care of that.
+"""
+import os
+
+
+def init_worker():
+    """Process initializer: set up Django in spawned processes"""
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'program_viewer.settings')
+        django.setup()
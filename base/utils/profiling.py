@@ -0,0 +1,85 @@
+import json
+import os
+import re
+import time
+import uuid
+from pathlib import Path
+from django.conf import settings
+
+
+def profiling_dir() -> Path:
+    return Path(getattr(settings, 'PROFILING_DIR', settings.BASE_DIR / 'profiles'))
+
+
+def describe_params(params, many=False) -> str:
+    """
+    Parameter types only (values can be password hashes, emails or notes), e.g.
+    "(int, str)"; for executemany, the number of parameter sets
+    """
+    if params is None:
+        return 'None'
+    if many:
+        return f'{len(params)} sets' if hasattr(params, '__len__') else 'many'
+    if isinstance(params, dict):
+        return '{' + ', '.join(f'{key}: {type(value).__name__}' for key, value in params.items()) + '}'
+    return '(' + ', '.join(type(value).__name__ for value in params) + ')'
+
+
+class SQLLogRecorder:
+    """
+    Execute wrapper keeping every statement of a profiled request with its duration.
+    Parameter values are only kept with PROFILING_CAPTURE_PARAMS; otherwise just their types.
+    """
+
+    def __init__(self):
+        self.statements = []
+        self.capture_params = getattr(settings, 'PROFILING_CAPTURE_PARAMS', False)
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.statements.append({
+                'sql': sql,
+                'params': repr(params)[:500] if self.capture_params else describe_params(params, many),
+                'many': many,
+                'alias': context['connection'].alias,
+                'duration_ms': round((time.perf_counter() - start) * 1000, 3),
+            })
+
+
+def save_capture(profiler, metadata: dict, statements: list) -> Path:
+    """
+    Write a profile (.prof, pstats format) and its metadata + SQL log (.json).
+
+    The .prof file can be turned into a flame graph with e.g. `flameprof` or
+    browsed with `snakeviz`. Older captures are pruned to PROFILING_MAX_CAPTURES.
+    """
+    directory = profiling_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+
+    endpoint_slug = re.sub(r'[^A-Za-z0-9]+', '-', metadata['endpoint']).strip('-') or 'unknown'
+    stem = f"{time.strftime('%Y%m%dT%H%M%S')}_{endpoint_slug}_{uuid.uuid4().hex[:6]}"
+
+    profiler.dump_stats(directory / f'{stem}.prof')
+    with open(directory / f'{stem}.json', 'w') as f:
+        json.dump({**metadata, 'profile': f'{stem}.prof', 'sql': statements}, f, indent=2)
+
+    prune_captures(getattr(settings, 'PROFILING_MAX_CAPTURES', 200))
+    return directory / f'{stem}.json'
+
+
+def list_captures() -> list:
+    """Return capture metadata files, newest first"""
+    directory = profiling_dir()
+    if not directory.exists():
+        return []
+    return sorted(directory.glob('*.json'), key=os.path.getmtime, reverse=True)
+
+
+def prune_captures(max_captures: int) -> None:
+    """Delete the oldest captures beyond max_captures"""
+    for meta_path in list_captures()[max_captures:]:
+        meta_path.with_suffix('.prof').unlink(missing_ok=True)
+        meta_path.unlink(missing_ok=True)
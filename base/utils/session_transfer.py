@@ -0,0 +1,187 @@
+"""
+Bulk import/export of a user's training history, shared by the management
+commands and the background job handlers in base/jobs.py.
+"""
+import csv
+import logging
+import os
+from datetime import datetime
+import pandas as pd
+from django.db import DatabaseError, transaction
+from django.db.models import Sum
+from base.models import Session, SessionEntry, SessionArchive, Exercise, MuscleGroup, ExerciseType
+from base.utils.analytics import invalidate_analytics
+from base.utils.legacy_cache import cached_frame
+from base.utils.legacy_data_handling import combine_exercises
+from base.utils.maintenance import analyze_tenant
+from base.utils.user_context import user_schema_context
+
+logger = logging.getLogger(__name__)
+
+LEGACY_EXERCISES_CSV = '_legacy/exercises.csv'
+# Legacy session_data.csv layout, so an export can be re-imported
+EXPORT_COLUMNS = ['Date', 'Exercise', 'Result', 'Weight', 'Status']
+# How often (in rows) progress callbacks are made
+PROGRESS_EVERY = 100
+
+
+def legacy_session_csv(email: str) -> str:
+    """Default location of a user's legacy session export"""
+    return f'_legacy/{email.split("@")[0]}/session_data.csv'
+
+
+def legacy_review_csv(session_csv: str) -> str:
+    """Where the names that could not be matched to the exercise list are written for review"""
+    return os.path.join(os.path.dirname(session_csv), 'unmatched_exercises.csv')
+
+
+def load_legacy_sessions(session_csv: str, exercise_csv: str = LEGACY_EXERCISES_CSV, review_path: str = None) -> pd.DataFrame:
+    """
+    Read a legacy session export and normalise it against the legacy exercise list.
+    Rows whose exercise could not be matched keep a NaN MuscleGroup; if there are
+    any and review_path is given, their names and best candidates are written there.
+    Results are cached per file contents (see base/utils/legacy_cache.py).
+    """
+    def build(review_file):
+        session_data = pd.read_csv(session_csv)
+        exercise_data = pd.read_csv(exercise_csv)
+        return combine_exercises(session_data, exercise_data, save_dir=None, review_path=review_file)
+
+    return cached_frame([session_csv, exercise_csv], build, review_path=review_path)
+
+
+def import_sessions(user, combined_data: pd.DataFrame, progress=None):
+    """
+    Import normalised legacy rows into the user's sessions, in one transaction,
+    then refresh the planner statistics of the user's tables.
+
+    Rows left unmatched by combine_exercises (NaN MuscleGroup) are skipped rather
+    than creating exercises outside the catalog. Rows in months that are already
+    archived are merged into those archives (see archive_month).
+
+    progress, if given, is called as progress(rows_done, rows_total).
+    Returns (sessions_created, entries_created, rows_skipped).
+    """
+    from base.utils.archive import archive_month
+
+    matched = combined_data['MuscleGroup'].notna()
+    rows_skipped = int((~matched).sum())
+    combined_data = combined_data[matched]
+    total = len(combined_data)
+    # Set user schema context and import within that context
+    with user_schema_context(user):
+        # Use transaction to rollback everything if there's an error
+        with transaction.atomic():
+            sessions_created = 0
+            entries_created = 0
+
+            # Iterate through combined data
+            for done, (_, row) in enumerate(combined_data.iterrows(), start=1):
+                exercise_name = row['Exercise']
+                muscle_group_name = row['MuscleGroup']
+                exercise_type_name = row['exercise_type'] if pd.notna(row['exercise_type']) else ''
+
+                # Get or create the MuscleGroup object
+                muscle_group_obj, _ = MuscleGroup.objects.get_or_create(
+                    muscle_group_name=muscle_group_name
+                )
+
+                # Get or create the ExerciseType object
+                exercise_type_obj = None
+                if exercise_type_name:
+                    exercise_type_obj, _ = ExerciseType.objects.get_or_create(
+                        type_name=exercise_type_name
+                    )
+
+                # Get or create exercise
+                exercise_obj, _ = Exercise.objects.get_or_create(
+                    exercise_name=exercise_name,
+                    defaults={
+                        'exercise_name_legacy': exercise_name,
+                        'muscle_group': muscle_group_obj,
+                        'exercise_type': exercise_type_obj
+                    }
+                )
+
+                # Get or create session for this date and user
+                # Multiple entries can belong to the same date/session
+                session, created = Session.objects.get_or_create(
+                    date=datetime.strptime(row['Date'], '%Y-%m-%d').date(),
+                    user=user,
+                    defaults={'notes': '', 'completed': True}
+                )
+                if created:
+                    sessions_created += 1
+
+                # Create session entry
+                SessionEntry.objects.create(
+                    session=session,
+                    exercise=exercise_obj,
+                    weight=str(row['Weight']),
+                    status=row['Status']
+                )
+                entries_created += 1
+
+                if progress and (done % PROGRESS_EVERY == 0 or done == total):
+                    progress(done, total)
+
+            # Dates in months that were already archived got a hot session; fold those
+            # months back into their archives so no day is listed twice
+            imported_months = {
+                datetime.strptime(day, '%Y-%m-%d').date().replace(day=1) for day in combined_data['Date'].unique()
+            }
+            archived_months = SessionArchive.objects.filter(user=user, month__in=imported_months)
+            for month in sorted(archived_months.values_list('month', flat=True)):
+                archive_month(user, month)
+
+            invalidate_analytics(user.id)
+
+    # The bulk insert leaves the tenant's tables without useful planner statistics.
+    # The rows are committed by now: a failure here must not fail (and re-run) the import
+    try:
+        analyze_tenant(user.id)
+    except DatabaseError:
+        logger.exception("ANALYZE after importing for user %s failed", user.id)
+    return sessions_created, entries_created, rows_skipped
+
+
+def export_sessions(user, path, progress=None) -> int:
+    """
+    Write the user's full history (archived months included) to a CSV at path,
+    one row per entry.
+    Returns the row count.
+    """
+    from base.utils.archive import archived_entry_rows, DELETED_EXERCISE_NAME
+
+    with user_schema_context(user):
+        exercise_names = dict(Exercise.objects.values_list('id', 'exercise_name'))
+        entries = (
+            SessionEntry.objects
+            .filter(session__user=user)
+            .select_related('session', 'exercise')
+            .order_by('session__date', 'id')
+        )
+        archived_total = SessionArchive.objects.filter(user=user).aggregate(n=Sum('entry_count'))['n'] or 0
+        total = entries.count() + archived_total
+        rows = 0
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(EXPORT_COLUMNS)
+            # Archived months are older than anything still in the hot tables
+            for entry_date, exercise_id, weight, status in archived_entry_rows(user):
+                writer.writerow([entry_date, exercise_names.get(exercise_id, DELETED_EXERCISE_NAME), '', weight, status])
+                rows += 1
+            for entry in entries.iterator(chunk_size=2000):
+                writer.writerow([
+                    entry.session.date.isoformat(),
+                    entry.exercise.exercise_name,
+                    '',
+                    entry.weight,
+                    entry.status,
+                ])
+                rows += 1
+                if progress and rows % (PROGRESS_EVERY * 10) == 0:
+                    progress(rows, total)
+    if progress:
+        progress(rows, total)
+    return rows
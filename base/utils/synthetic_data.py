@@ -0,0 +1,199 @@
+"""
+Synthetic tenant data for scale testing.
+
+Functions here run inside worker processes, so Django models are imported lazily
+(the pool sets Django up with base.utils.processes.init_worker).
+"""
+import math
+import random
+from datetime import date, timedelta
+
+# Starting working weight (kg) by exercise type for an average trainee
+TYPE_BASE_WEIGHT = {
+    'Barbell': 40.0, 'Smith': 40.0, 'T-Bar': 30.0, 'Machine': 45.0,
+    'Cable': 25.0, 'Dumbell': 14.0, 'Kettlebell': 16.0, 'Plate': 15.0,
+}
+# Types logged without a load (bodyweight and cardio)
+UNLOADED_TYPES = {'Body', 'Erg', 'Run', 'Bike', 'Core', ''}
+MUSCLE_GROUP_FACTOR = {
+    'Legs': 1.6, 'Back': 1.2, 'Chest': 1.1, 'Shoulders': 0.7, 'Shoulder': 0.7,
+    'Biceps': 0.5, 'Triceps': 0.55, 'Forearms': 0.45, 'Core': 0.6,
+}
+# Smallest plate jump per type, weights are rounded to a multiple of this
+TYPE_INCREMENT = {'Dumbell': 1.0, 'Kettlebell': 4.0, 'Cable': 2.5}
+
+
+def load_catalog(path: str) -> list:
+    """
+    Make sure every exercise in the legacy catalog exists in the shared tables
+    and return it as plain dicts that can be sent to worker processes.
+    Exercise names follow import_sessions: "<exercise> - <exercise_type>".
+    """
+    import pandas as pd
+    from base.models import Exercise, ExerciseType, MuscleGroup
+
+    catalog = []
+    exercise_data = pd.read_csv(path).fillna('')
+    for row in exercise_data.itertuples(index=False):
+        exercise_type_name = row.exercise_type.strip()
+        muscle_group_name = row.MuscleGroup.strip()
+        muscle_group_obj, _ = MuscleGroup.objects.get_or_create(muscle_group_name=muscle_group_name)
+        exercise_type_obj = None
+        if exercise_type_name:
+            exercise_type_obj, _ = ExerciseType.objects.get_or_create(type_name=exercise_type_name)
+        exercise_name = f"{row.exercise} - {exercise_type_name}" if exercise_type_name else row.exercise
+        exercise_obj, _ = Exercise.objects.get_or_create(
+            exercise_name=exercise_name,
+            defaults={
+                'exercise_name_legacy': row.exercise,
+                'muscle_group': muscle_group_obj,
+                'exercise_type': exercise_type_obj,
+            }
+        )
+        catalog.append({
+            'id': exercise_obj.id,
+            'muscle_group': muscle_group_name,
+            'exercise_type': exercise_type_name,
+        })
+    return catalog
+
+
+def generate_history(rng: random.Random, catalog: list, years: float, sessions_per_week: float, end: date):
+    """
+    Generate one tenant's training history.
+
+    Returns a list of (date, [(exercise_id, weight, status), ...]) tuples. Each
+    user trains a personal subset of the catalog on muscle-group focused days,
+    with loads that start from a per-user strength level and progress with
+    diminishing returns plus day-to-day noise.
+    """
+    by_group = {}
+    for exercise in catalog:
+        by_group.setdefault(exercise['muscle_group'], []).append(exercise)
+    groups = [g for g in by_group if g]
+    # Each user favours a subset of exercises within every muscle group
+    favourites = {
+        group: rng.sample(by_group[group], max(1, round(len(by_group[group]) * rng.uniform(0.3, 0.7))))
+        for group in groups
+    }
+
+    strength = rng.lognormvariate(0.0, 0.3)
+    progress_rate = {}
+    base_weight = {}
+    best = {}
+
+    history = []
+    start = end - timedelta(days=round(years * 365))
+    week_start = start
+    while week_start <= end:
+        n_sessions = min(7, max(0, round(rng.gauss(sessions_per_week, 1.0))))
+        for offset in sorted(rng.sample(range(7), n_sessions)):
+            day = week_start + timedelta(days=offset)
+            if day > end:
+                break
+            elapsed_years = (day - start).days / 365
+            focus = rng.sample(groups, min(len(groups), rng.choice((1, 2, 2, 3))))
+            pool = [exercise for group in focus for exercise in favourites[group]]
+            entries = []
+            for exercise in rng.sample(pool, min(len(pool), rng.randint(4, 7))):
+                weight, status = _next_set(rng, exercise, elapsed_years, strength, progress_rate, base_weight, best)
+                entries.append((exercise['id'], weight, status))
+            history.append((day, entries))
+        week_start += timedelta(days=7)
+    return history
+
+
+def _next_set(rng, exercise, elapsed_years, strength, progress_rate, base_weight, best):
+    exercise_id = exercise['id']
+    exercise_type = exercise['exercise_type']
+    if exercise_type in UNLOADED_TYPES or exercise_type not in TYPE_BASE_WEIGHT:
+        return '0.00', rng.choices(('Working', 'Static'), (0.7, 0.3))[0]
+
+    if exercise_id not in base_weight:
+        base_weight[exercise_id] = (
+            TYPE_BASE_WEIGHT[exercise_type]
+            * MUSCLE_GROUP_FACTOR.get(exercise['muscle_group'], 1.0)
+            * strength
+            * rng.lognormvariate(0.0, 0.15)
+        )
+        progress_rate[exercise_id] = max(0.0, rng.gauss(0.35, 0.15))
+
+    trend = base_weight[exercise_id] * (1 + progress_rate[exercise_id] * math.log1p(elapsed_years * 2))
+    increment = TYPE_INCREMENT.get(exercise_type, 2.5)
+    weight = max(increment, round(trend * rng.gauss(1.0, 0.04) / increment) * increment)
+
+    if weight > best.get(exercise_id, 0.0):
+        best[exercise_id] = weight
+        status = 'Peak'
+    else:
+        status = rng.choices(('Working', 'Static'), (0.8, 0.2))[0]
+    return f'{weight:.2f}', status
+
+
+def seed_tenants(user_ids: list, catalog: list, years: float, sessions_per_week: float, seed: int) -> tuple:
+    """
+    Provision tenant storage and insert a generated history for each user id.
+    Runs in a worker process; returns (sessions_created, entries_created).
+    """
+    from django.contrib.auth.models import User
+    from django.db import connections, transaction
+    from base.models import Session, SessionEntry
+    from base.utils.analytics import invalidate_analytics
+    from base.utils.tenancy import provision_tenant
+    from base.utils.user_context import user_schema_context
+
+    end = date.today()
+    sessions_created = 0
+    entries_created = 0
+    try:
+        for user_id in user_ids:
+            rng = random.Random(seed * 1_000_003 + user_id)
+            history = generate_history(rng, catalog, years, sessions_per_week, end)
+            provision_tenant(user_id)
+
+            with user_schema_context(User(id=user_id)), transaction.atomic():
+                sessions = Session.objects.bulk_create(
+                    [Session(user_id=user_id, date=day, notes='', completed=True) for day, _ in history],
+                    batch_size=2000,
+                )
+                entries = [
+                    SessionEntry(session_id=session.id, exercise_id=exercise_id, weight=weight, status=status)
+                    for session, (_, day_entries) in zip(sessions, history)
+                    for exercise_id, weight, status in day_entries
+                ]
+                SessionEntry.objects.bulk_create(entries, batch_size=5000)
+                # bulk_create sends no post_save signals
+                invalidate_analytics(user_id)
+
+            sessions_created += len(sessions)
+            entries_created += len(entries)
+    finally:
+        connections.close_all()
+    return sessions_created, entries_created
+
+
+BENCH_PASSWORD = 'bench-password-123'
+
+
+def bench_username(years: float) -> str:
+    return f'bench_{years:g}y'.replace('.', '_')
+
+
+def ensure_bench_tenant(years: float, catalog_path: str = '_legacy/exercises.csv'):
+    """
+    Return the bench_<years>y user, seeding it with that much history first if needed.
+    Shared by the benchmark and query plan commands so they measure the same data.
+    """
+    from django.contrib.auth.models import User
+
+    username = bench_username(years)
+    user = User.objects.filter(username=username).first()
+    if user is None:
+        catalog = load_catalog(catalog_path)
+        user = User.objects.create_user(
+            username=username,
+            email=f'{username}@bench.example.com',
+            password=BENCH_PASSWORD,
+        )
+        seed_tenants([user.id], catalog, years, sessions_per_week=4, seed=0)
+    return user
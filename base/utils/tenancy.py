@@ -0,0 +1,221 @@
+"""
+Tenancy backends: how tenant-owned tables (base_session, base_sessionentry,
+base_sessionarchive) are stored and how a connection is pointed at one
+tenant's rows.
+
+Selected with settings.TENANCY_BACKEND:
+
+- 'schema' (default): one user_N schema per user, selected with search_path.
+- 'shared': shared tables in the tenant_shared schema, hash-partitioned by
+  user_id and isolated by row-level security policies that read the
+  app.current_user_id session variable. Run `setup_shared_tenancy` first and
+  `migrate_tenants_to_shared` to move existing tenants across.
+
+Either way models and views are unchanged: unqualified table names resolve
+through search_path, and bind_tenant_search_path applies bind_sql() whenever the
+active tenant changes.
+"""
+from functools import lru_cache
+from django.conf import settings
+from django.db import connection, transaction
+
+SHARED_SCHEMA = 'tenant_shared'
+TENANT_TABLES = ('base_session', 'base_sessionentry', 'base_sessionarchive')
+DEFAULT_SHARED_PARTITIONS = 64
+
+# Row owner as seen by the RLS policies and used as the default for new rows.
+# missing_ok=true makes an unbound connection see NULL, i.e. no rows at all.
+CURRENT_TENANT_SQL = "NULLIF(current_setting('app.current_user_id', true), '')::integer"
+
+
+class SchemaTenancyBackend:
+    """One PostgreSQL schema (user_N) per tenant"""
+    name = 'schema'
+
+    def bind_sql(self, tenant_id):
+        if tenant_id:
+            return f"SET search_path TO user_{int(tenant_id)}, public;"
+        return "SET search_path TO public;"
+
+    def provision(self, user_id):
+        from base.utils.user_context import create_user_schema
+        create_user_schema(user_id)
+
+    def drop(self, user_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DROP SCHEMA IF EXISTS user_{int(user_id)} CASCADE;")
+
+    def tenant_tables(self, user_id):
+        schema_name = f"user_{int(user_id)}"
+        return [f"{schema_name}.{table}" for table in TENANT_TABLES]
+
+    def user_ids(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT nspname FROM pg_namespace WHERE nspname ~ '^user_[0-9]+$';")
+            return sorted(int(row[0].split('_', 1)[1]) for row in cursor.fetchall())
+
+
+class SharedTableTenancyBackend:
+    """Shared hash-partitioned tables isolated with row-level security"""
+    name = 'shared'
+
+    def bind_sql(self, tenant_id):
+        if tenant_id:
+            return (
+                f"SET search_path TO {SHARED_SCHEMA}, public; "
+                f"SELECT set_config('app.current_user_id', '{int(tenant_id)}', false);"
+            )
+        # No tenant: back to the public tables (e.g. for migrations), with no tenant visible
+        return "SET search_path TO public; SELECT set_config('app.current_user_id', '', false);"
+
+    def provision(self, user_id):
+        # Hash partitions already cover every user id
+        pass
+
+    def drop(self, user_id):
+        # set_config(..., true) only lasts until the end of the transaction: outside an
+        # atomic block (autocommit) it would be gone before the DELETEs, and the RLS
+        # policy would silently hide every row from them
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('app.current_user_id', %s, true);", [str(int(user_id))])
+            # Fail loudly rather than delete nothing and report success
+            cursor.execute("SELECT current_setting('app.current_user_id', true);")
+            if cursor.fetchone()[0] != str(int(user_id)):
+                raise RuntimeError(f"Tenant {user_id} is not visible to drop(): RLS setting not in effect")
+            cursor.execute(f"DELETE FROM {SHARED_SCHEMA}.base_session WHERE user_id = %s;", [user_id])
+            cursor.execute(f"DELETE FROM {SHARED_SCHEMA}.base_sessionarchive WHERE user_id = %s;", [user_id])
+
+    def tenant_tables(self, user_id):
+        # The hash partitions holding this user's rows
+        tables = []
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute("SELECT set_config('app.current_user_id', %s, true);", [str(int(user_id))])
+            for table in TENANT_TABLES:
+                cursor.execute("SELECT to_regclass(%s);", [f"{SHARED_SCHEMA}.{table}"])
+                if cursor.fetchone()[0] is None:
+                    continue
+                cursor.execute(
+                    f"SELECT tableoid::regclass::text FROM {SHARED_SCHEMA}.{table} WHERE user_id = %s LIMIT 1;",
+                    [user_id],
+                )
+                tables += [row[0] for row in cursor.fetchall()]
+        return tables
+
+    def user_ids(self):
+        # Every user is a tenant of the shared tables
+        from django.contrib.auth.models import User
+        return list(User.objects.order_by('id').values_list('id', flat=True))
+
+
+def shared_tenancy_ddl(partitions: int = DEFAULT_SHARED_PARTITIONS) -> list:
+    """Idempotent DDL creating the shared, partitioned, RLS-protected tenant tables"""
+    ddl = [
+        f"CREATE SCHEMA IF NOT EXISTS {SHARED_SCHEMA};",
+        f"CREATE SEQUENCE IF NOT EXISTS {SHARED_SCHEMA}.base_session_id_seq;",
+        f"CREATE SEQUENCE IF NOT EXISTS {SHARED_SCHEMA}.base_sessionentry_id_seq;",
+        f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_SCHEMA}.base_session (
+                id INTEGER NOT NULL DEFAULT nextval('{SHARED_SCHEMA}.base_session_id_seq'),
+                user_id INTEGER NOT NULL DEFAULT {CURRENT_TENANT_SQL}
+                    REFERENCES auth_user(id) ON DELETE CASCADE,
+                date DATE NOT NULL,
+                notes TEXT DEFAULT '',
+                completed BOOLEAN DEFAULT FALSE,
+                created_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (user_id, id)
+            ) PARTITION BY HASH (user_id);
+        """,
+        f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_SCHEMA}.base_sessionentry (
+                id INTEGER NOT NULL DEFAULT nextval('{SHARED_SCHEMA}.base_sessionentry_id_seq'),
+                user_id INTEGER NOT NULL DEFAULT {CURRENT_TENANT_SQL},
+                session_id INTEGER NOT NULL,
+                exercise_id INTEGER NOT NULL REFERENCES public.base_exercise(id) ON DELETE CASCADE,
+                weight VARCHAR(50) NOT NULL,
+                status VARCHAR(50) NOT NULL,
+                created_at TIMESTAMP DEFAULT NOW(),
+                PRIMARY KEY (user_id, id),
+                FOREIGN KEY (user_id, session_id)
+                    REFERENCES {SHARED_SCHEMA}.base_session(user_id, id) ON DELETE CASCADE
+            ) PARTITION BY HASH (user_id);
+        """,
+        f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_SCHEMA}.base_sessionarchive (
+                id INTEGER GENERATED BY DEFAULT AS IDENTITY,
+                user_id INTEGER NOT NULL DEFAULT {CURRENT_TENANT_SQL}
+                    REFERENCES auth_user(id) ON DELETE CASCADE,
+                month DATE NOT NULL,
+                session_count INTEGER NOT NULL DEFAULT 0,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                payload JSONB NOT NULL DEFAULT '{{}}',
+                archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                PRIMARY KEY (user_id, id),
+                UNIQUE (user_id, month)
+            ) PARTITION BY HASH (user_id);
+        """,
+    ]
+    for table in TENANT_TABLES:
+        for remainder in range(partitions):
+            ddl.append(
+                f"CREATE TABLE IF NOT EXISTS {SHARED_SCHEMA}.{table}_p{remainder} "
+                f"PARTITION OF {SHARED_SCHEMA}.{table} "
+                f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {remainder});"
+            )
+        ddl += [
+            f"ALTER TABLE {SHARED_SCHEMA}.{table} ENABLE ROW LEVEL SECURITY;",
+            # Apply the policy to the table owner too (superusers and BYPASSRLS roles still bypass it)
+            f"ALTER TABLE {SHARED_SCHEMA}.{table} FORCE ROW LEVEL SECURITY;",
+            f"DROP POLICY IF EXISTS tenant_isolation ON {SHARED_SCHEMA}.{table};",
+            f"""
+                CREATE POLICY tenant_isolation ON {SHARED_SCHEMA}.{table}
+                    USING (user_id = {CURRENT_TENANT_SQL})
+                    WITH CHECK (user_id = {CURRENT_TENANT_SQL});
+            """,
+        ]
+    ddl += [
+        f"CREATE INDEX IF NOT EXISTS shared_session_user_date_idx ON {SHARED_SCHEMA}.base_session(user_id, date);",
+        f"CREATE INDEX IF NOT EXISTS shared_sessionentry_session_idx "
+        f"ON {SHARED_SCHEMA}.base_sessionentry(user_id, session_id);",
+        f"CREATE INDEX IF NOT EXISTS shared_sessionentry_exercise_session_idx "
+        f"ON {SHARED_SCHEMA}.base_sessionentry(user_id, exercise_id, session_id);",
+        # Tenants copied over by migrate_tenants_to_shared, with a checksum of the source rows
+        f"""
+            CREATE TABLE IF NOT EXISTS {SHARED_SCHEMA}.migrated_tenants (
+                user_id INTEGER PRIMARY KEY REFERENCES auth_user(id) ON DELETE CASCADE,
+                source_checksum TEXT NOT NULL,
+                migrated_at TIMESTAMP DEFAULT NOW()
+            );
+        """,
+    ]
+    return ddl
+
+
+BACKENDS = {
+    SchemaTenancyBackend.name: SchemaTenancyBackend,
+    SharedTableTenancyBackend.name: SharedTableTenancyBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_tenancy_backend():
+    """The backend selected by settings.TENANCY_BACKEND"""
+    name = getattr(settings, 'TENANCY_BACKEND', SchemaTenancyBackend.name)
+    try:
+        return BACKENDS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown TENANCY_BACKEND {name!r}, expected one of {sorted(BACKENDS)}")
+
+
+def provision_tenant(user_id: int) -> None:
+    """Create storage for a new user (a schema, or nothing for shared tables)"""
+    get_tenancy_backend().provision(user_id)
+
+
+def drop_tenant(user_id: int) -> None:
+    """Remove all of a user's tenant data"""
+    get_tenancy_backend().drop(user_id)
+
+
+def tenant_user_ids() -> list:
+    """Ids of the users that have tenant storage"""
+    return get_tenancy_backend().user_ids()
@@ -1,32 +1,107 @@
-from django.db import connection, models
+from django.db import connection, connections, models
+from django.db.backends.signals import connection_created
 from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from concurrent.futures import ThreadPoolExecutor
+from base.utils.metrics import current_request_metrics
+from base.utils.tenancy import get_tenancy_backend
 
-class UserSchemaManager(models.Manager):
+# Active tenant (user id) for the current thread / asyncio task.
+# Context variables are copied into asyncio tasks and sync_to_async calls, and
+# into TenantThreadPoolExecutor workers, so the tenant follows the work around.
+_current_tenant_id = ContextVar('current_tenant_id', default=None)
+
+# Marks a connection whose search_path is not known (e.g. handed out by a pool)
+_UNKNOWN = object()
+
+
+def current_tenant_id():
+    """Return the user id whose schema queries are currently routed to, or None"""
+    return _current_tenant_id.get()
+
+
+def set_current_tenant(user_id):
+    """Route queries to user_id's schema; returns a token for reset_current_tenant()"""
+    return _current_tenant_id.set(user_id)
+
+
+def reset_current_tenant(token):
+    _current_tenant_id.reset(token)
+
+
+def bind_tenant_search_path(execute, sql, params, many, context):
     """
-    Custom manager that ensures queries use the current user's schema.
-    Set via thread-local storage in the activate() function.
+    Execute wrapper that points the connection running a query at the active tenant
+    (search_path, plus the RLS session variable for the shared-table backend).
+
+    The search_path is only changed when the connection's current binding differs
+    from the tenant in context, so consecutive queries for the same tenant cost
+    nothing extra.
+
+    A SET inside a transaction or savepoint that is later rolled back is undone
+    by PostgreSQL. A binding made inside an atomic block therefore registers an
+    on_commit marker: Django discards it when the savepoint or transaction
+    rolls back, and a missing marker means the binding is no longer known.
     """
+    conn = context['connection']
+    tenant_id = _current_tenant_id.get()
+    marker = getattr(conn, '_tenant_bind_marker', None)
+    if marker is not None and not any(hook[1] is marker for hook in conn.run_on_commit):
+        conn._tenant_bound = _UNKNOWN
+        conn._tenant_bind_marker = None
+    if getattr(conn, '_tenant_bound', _UNKNOWN) != tenant_id:
+        # Run on the raw cursor so the statement does not re-enter the wrappers
+        context['cursor'].cursor.execute(get_tenancy_backend().bind_sql(tenant_id))
+        conn._tenant_bound = tenant_id
+        conn._tenant_bind_marker = _rollback_marker(conn) if conn.in_atomic_block else None
+        metrics = current_request_metrics()
+        if metrics is not None:
+            metrics.query_count += 1
+            metrics.search_path_switches += 1
+    return execute(sql, params, many, context)
 
-    def get_queryset(self):
-        qs = super().get_queryset()
-        # Get current user from thread-local storage (set by activate())
-        current_user_id = getattr(connection, '_current_user_id', None)
-        if current_user_id:
-            schema_name = f"user_{current_user_id}"
-            with connection.cursor() as cursor:
-                cursor.execute(f"SET search_path TO {schema_name}, public;")
-        return qs
-    
-def create_user_schema(user_id: int) -> None:
-    """Create PostgreSQL schema for new user with all tables"""
 
-    schema_name = f"user_{user_id}"
-    with connection.cursor() as cursor:
-        # Create schema
-        cursor.execute(f"CREATE SCHEMA IF NOT EXISTS {schema_name};")
-        
-        # Create Session table in user schema
-        cursor.execute(f"""
+def _rollback_marker(conn):
+    """on_commit hook that only survives if the binding's transaction commits"""
+    def committed():
+        if conn._tenant_bind_marker is committed:
+            conn._tenant_bind_marker = None
+    conn.on_commit(committed)
+    return committed
+
+
+def install_tenant_binding(sender, connection, **kwargs):
+    """connection_created handler: attach bind_tenant_search_path to every new connection"""
+    if bind_tenant_search_path not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, bind_tenant_search_path)
+    # A brand new connection starts on the default (public) search_path; one from a
+    # pool may still carry a previous tenant's, so force a SET before its first query
+    pooled = bool(connection.settings_dict.get('OPTIONS', {}).get('pool'))
+    connection._tenant_bound = _UNKNOWN if pooled else None
+    connection._tenant_bind_marker = None
+
+
+connection_created.connect(install_tenant_binding, dispatch_uid='base.install_tenant_binding')
+
+
+class UserSchemaManager(models.Manager):
+    """
+    Manager for models stored in the per-user schemas.
+
+    Queries are routed to the active tenant's schema by bind_tenant_search_path
+    at execution time, on whichever connection actually runs them. Activate a
+    tenant with user_schema_context() or User.activate().
+    """
+    
+def tenant_schema_ddl(schema_name: str) -> list:
+    """
+    Idempotent DDL for one tenant schema, in execution order.
+    Used for new users and re-applied to existing schemas by sync_tenant_schemas.
+    """
+    return [
+        f"CREATE SCHEMA IF NOT EXISTS {schema_name};",
+        # Session table in user schema
+        f"""
             CREATE TABLE IF NOT EXISTS {schema_name}.base_session (
                 id SERIAL PRIMARY KEY,
                 user_id INTEGER NOT NULL REFERENCES auth_user(id) ON DELETE CASCADE,
@@ -35,12 +110,11 @@ def create_user_schema(user_id: int) -> None:
                 completed BOOLEAN DEFAULT FALSE,
                 created_at TIMESTAMP DEFAULT NOW()
             );
-            CREATE INDEX {schema_name}_session_date_idx ON {schema_name}.base_session(date);
-            CREATE INDEX {schema_name}_session_user_idx ON {schema_name}.base_session(user_id);
-        """)
-        
-        # Create SessionEntry table in user schema
-        cursor.execute(f"""
+        """,
+        f"CREATE INDEX IF NOT EXISTS {schema_name}_session_date_idx ON {schema_name}.base_session(date);",
+        f"CREATE INDEX IF NOT EXISTS {schema_name}_session_user_idx ON {schema_name}.base_session(user_id);",
+        # SessionEntry table in user schema
+        f"""
             CREATE TABLE IF NOT EXISTS {schema_name}.base_sessionentry (
                 id SERIAL PRIMARY KEY,
                 session_id INTEGER NOT NULL REFERENCES {schema_name}.base_session(id) ON DELETE CASCADE,
@@ -49,51 +123,87 @@ def create_user_schema(user_id: int) -> None:
                 status VARCHAR(50) NOT NULL,
                 created_at TIMESTAMP DEFAULT NOW()
             );
-            CREATE INDEX {schema_name}_sessionentry_session_idx ON {schema_name}.base_sessionentry(session_id);
-            CREATE INDEX {schema_name}_sessionentry_exercise_idx ON {schema_name}.base_sessionentry(exercise_id);
-        """)
+        """,
+        f"CREATE INDEX IF NOT EXISTS {schema_name}_sessionentry_session_idx ON {schema_name}.base_sessionentry(session_id);",
+        # Covers the EXISTS subqueries behind the exercise/muscle group session filters
+        # (index-only lookup of the sessions containing an exercise)
+        f"CREATE INDEX IF NOT EXISTS {schema_name}_sessionentry_exercise_session_idx "
+        f"ON {schema_name}.base_sessionentry(exercise_id, session_id);",
+        # Superseded by the (exercise_id, session_id) index above, which also serves exercise_id lookups
+        f"DROP INDEX IF EXISTS {schema_name}.{schema_name}_sessionentry_exercise_idx;",
+        # Month-level archive of old sessions (see base/utils/archive.py)
+        f"""
+            CREATE TABLE IF NOT EXISTS {schema_name}.base_sessionarchive (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES auth_user(id) ON DELETE CASCADE,
+                month DATE NOT NULL,
+                session_count INTEGER NOT NULL DEFAULT 0,
+                entry_count INTEGER NOT NULL DEFAULT 0,
+                payload JSONB NOT NULL DEFAULT '{{}}',
+                archived_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+                CONSTRAINT {schema_name}_sessionarchive_user_month_uniq UNIQUE (user_id, month)
+            );
+        """,
+    ]
+
+
+def create_user_schema(user_id: int) -> None:
+    """Create PostgreSQL schema for new user with all tables"""
+
+    schema_name = f"user_{user_id}"
+    with connection.cursor() as cursor:
+        for statement in tenant_schema_ddl(schema_name):
+            cursor.execute(statement)
 
 @contextmanager
 def user_schema_context(user):
     """
-    Context manager that sets the PostgreSQL schema context for a user.
-    Automatically resets to public schema on exit.
+    Context manager that routes queries to a user's schema.
+    Restores the previous tenant (usually none, i.e. public) on exit.
+
+    Safe to use from threads and asyncio tasks: the tenant lives in a context
+    variable, not on the shared connection object.
 
     Args:
         user: Django User instance
     """
-    schema_name = f"user_{user.id}"
-    
-    # Set schema
-    with connection.cursor() as cursor:
-        cursor.execute(f"SET search_path TO {schema_name}, public;")
-    
-    # Store user ID on connection for the custom manager
-    connection._current_user_id = user.id
-    
+    token = _current_tenant_id.set(user.id)
     try:
         yield
     finally:
-        # Reset to public schema
-        with connection.cursor() as cursor:
-            cursor.execute("SET search_path TO public;")
-        connection._current_user_id = None
+        _current_tenant_id.reset(token)
+
+
+class TenantThreadPoolExecutor(ThreadPoolExecutor):
+    """
+    ThreadPoolExecutor whose tasks run in a copy of the submitting context, so
+    they see the tenant that was active at submit() time.
+
+    Each worker thread uses its own database connections; they are closed when
+    a task finishes so no connection outlives the pool.
+    """
+
+    def submit(self, fn, /, *args, **kwargs):
+        context = copy_context()
+        return super().submit(context.run, _run_and_release_connections, fn, *args, **kwargs)
+
+
+def _run_and_release_connections(fn, *args, **kwargs):
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        connections.close_all()
+
 
 def activate(self):
     """
-    Activate this user's PostgreSQL schema context.
-    Sets the flag that UserSchemaManager checks to route queries to the user's schema.
+    Activate this user's PostgreSQL schema context (intended for the Django shell).
+    Sets the current tenant so UserSchemaManager queries go to the user's schema.
     
     Returns:
         self (for method chaining)
     """
-    # Store user ID on connection for UserSchemaManager to use
-    connection._current_user_id = self.id
-    
-    # Close the connection so next query gets a fresh connection
-    # UserSchemaManager will set the search_path on the new connection
-    connection.close()
+    _current_tenant_id.set(self.id)
     
     print(f"✓ Activated schema: user_{self.id} for user {self.email}")
     return self
-
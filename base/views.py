@@ -3,19 +3,29 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from rest_framework_simplejwt.views import TokenObtainPairView
-from django.db import connection
+from django.conf import settings
 from .serializers import RegisterSerializer, UserSerializer, CustomTokenObtainPairSerializer
-from .utils.user_context import create_user_schema
+from .jobs import enqueue
+from .utils.tenancy import provision_tenant
+from api.throttling import REGISTER_COST
 
 class RegisterView(APIView):
+    # Registration runs tenant DDL, so it is throttled per client IP
+    throttle_scope = 'register'
+    throttle_cost = REGISTER_COST
+
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
             
-            # Create user's schema with tables
+            # Create user's tenant storage (schema with tables, for the schema backend),
+            # or leave it to a background worker
             try:
-                create_user_schema(user.id)
+                if settings.PROVISION_TENANTS_ASYNC:
+                    enqueue('provision_tenant', user=user)
+                else:
+                    provision_tenant(user.id)
             except Exception as e:
                 # Log error but don't fail registration
                 print(f"Error creating schema for user {user.id}: {str(e)}")
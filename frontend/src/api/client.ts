@@ -105,6 +105,23 @@ export async function fetchExercises(params?: {
   return response.json()
 }
 
+// Ranked type-ahead suggestions from the server-side exercise index
+export async function suggestExercises(params: {
+  query?: string
+  muscleGroupId?: number
+  limit?: number
+}): Promise<Exercise[]> {
+  const searchParams = new URLSearchParams()
+  
+  if (params.query) searchParams.append('q', params.query)
+  if (params.muscleGroupId) searchParams.append('muscle_group', params.muscleGroupId.toString())
+  if (params.limit) searchParams.append('limit', params.limit.toString())
+
+  const response = await fetch(`${API_BASE}/exercises/suggest/?${searchParams.toString()}`)
+  if (!response.ok) throw new Error('Failed to fetch exercise suggestions')
+  return response.json()
+}
+
 // Fetch all muscle groups
 export async function fetchMuscleGroups(): Promise<MuscleGroup[]> {
   const response = await fetch(`${API_BASE}/muscle-groups/`)
@@ -189,6 +206,45 @@ export async function updateSession(
   return response.json()
 }
 
+/* ----- LIVE UPDATES ----- */
+
+// Changes pushed by /api/events/ when the user edits data on any device.
+// 'resync' (or an event without data) means something may have been missed: refetch
+export type LiveEvent =
+  | { type: 'session.created' | 'session.updated'; data: Session | null }
+  | { type: 'session.deleted'; data: { id: number } }
+  | { type: 'entry.created' | 'entry.updated'; data: { session_id: number; entry: SessionEntry } }
+  | { type: 'entry.deleted'; data: { id: number; session_id: number } }
+  | { type: 'resync'; data: null }
+
+// Open the Server-Sent Events stream; returns a function that closes it
+export function subscribeToEvents(onEvent: (event: LiveEvent) => void): () => void {
+  const token = localStorage.getItem('access_token')
+  if (!token || typeof EventSource === 'undefined') return () => {}
+
+  // EventSource can't send headers, so the access token goes in the query string
+  const source = new EventSource(`${API_BASE}/events/?token=${encodeURIComponent(token)}`)
+  let reconnecting = false
+  source.onmessage = (message) => {
+    try {
+      onEvent(JSON.parse(message.data))
+    } catch (err) {
+      console.error('Bad live event:', err)
+    }
+  }
+  // EventSource reconnects by itself; anything sent while disconnected is lost
+  source.onerror = () => {
+    reconnecting = true
+  }
+  source.onopen = () => {
+    if (reconnecting) {
+      reconnecting = false
+      onEvent({ type: 'resync', data: null })
+    }
+  }
+  return () => source.close()
+}
+
 /* ----- AUTH FUNCTIONS ----- */
 
 export interface User {
@@ -16,6 +16,8 @@ interface AddExerciseModalProps {
   onFormChange: (newData: Partial<FormData>) => void
   muscleGroups: MuscleGroup[]
   filteredExercises: Exercise[]
+  exerciseQuery: string
+  onExerciseQueryChange: (query: string) => void
   isSubmitting: boolean
 }
 
@@ -27,6 +29,8 @@ export function AddExerciseModal({
   onFormChange,
   muscleGroups,
   filteredExercises,
+  exerciseQuery,
+  onExerciseQueryChange,
   isSubmitting,
 }: AddExerciseModalProps) {
   if (!isOpen) return null
@@ -104,20 +108,36 @@ export function AddExerciseModal({
             <label style={{ display: 'block', marginBottom: '0.5rem', color: '#cbd5e1', fontSize: '0.875rem', fontWeight: '600' }}>
               Exercise
             </label>
+            <input
+              type="text"
+              value={exerciseQuery}
+              onChange={(e) => onExerciseQueryChange(e.target.value)}
+              placeholder="Search exercises..."
+              style={{
+                width: '100%',
+                padding: '0.75rem',
+                marginBottom: '0.5rem',
+                borderRadius: '0.375rem',
+                border: '1px solid rgba(71, 85, 105, 0.3)',
+                background: 'rgba(30, 41, 59, 0.5)',
+                color: 'white',
+                fontSize: '0.875rem',
+              }}
+            />
             <select
               value={formData.exercise}
               onChange={(e) => onFormChange({ exercise: e.target.value })}
-              disabled={!formData.muscleGroup}
+              disabled={!formData.muscleGroup && !exerciseQuery}
               style={{
                 width: '100%',
                 padding: '0.75rem',
                 borderRadius: '0.375rem',
                 border: '1px solid rgba(71, 85, 105, 0.3)',
                 background: 'rgba(30, 41, 59, 0.5)',
-                color: formData.muscleGroup ? 'white' : '#64748b',
+                color: formData.muscleGroup || exerciseQuery ? 'white' : '#64748b',
                 fontSize: '0.875rem',
-                opacity: formData.muscleGroup ? 1 : 0.5,
-                cursor: formData.muscleGroup ? 'pointer' : 'not-allowed',
+                opacity: formData.muscleGroup || exerciseQuery ? 1 : 0.5,
+                cursor: formData.muscleGroup || exerciseQuery ? 'pointer' : 'not-allowed',
               }}
             >
               <option value="">Select an exercise</option>
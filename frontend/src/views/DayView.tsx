@@ -1,6 +1,6 @@
 import { useEffect, useState } from 'react'
 import { format } from 'date-fns'
-import { fetchSessions, Session, fetchExercises, Exercise, fetchMuscleGroups, MuscleGroup, createSession, addSessionEntry, deleteSessionEntry, deleteSession } from '../api/client'
+import { fetchSessions, Session, suggestExercises, Exercise, fetchMuscleGroups, MuscleGroup, createSession, addSessionEntry, deleteSessionEntry, deleteSession } from '../api/client'
 import { SummaryCards } from '../components/SummaryCards'
 import { ExercisesTable } from '../components/ExercisesTable'
 import { AddExerciseModal } from '../components/AddExerciseModal'
@@ -23,7 +23,8 @@ export function DayView({ date }: DayViewProps) {
   const [current_value, function_to_update_it] = useState(initial_value)
   */
   const [sessions, setSessions] = useState<Session[]>([])
-  const [exercises, setExercises] = useState<Exercise[]>([])
+  const [filteredExercises, setFilteredExercises] = useState<Exercise[]>([])
+  const [exerciseQuery, setExerciseQuery] = useState('')
   const [muscleGroups, setMuscleGroups] = useState<MuscleGroup[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
@@ -36,12 +37,26 @@ export function DayView({ date }: DayViewProps) {
   })
   const [submitting, setSubmitting] = useState(false)
 
-  // If formData.muscleGroup exists filter exercises by that muscle group
-  const filteredExercises = formData.muscleGroup
-    ? exercises.filter(ex => ex.muscle_group.id === parseInt(formData.muscleGroup))
-    : exercises
+  // Ask the server for matching exercises (filtered by muscle group if one is chosen)
+  // instead of downloading the whole catalog; debounced while the user types
+  useEffect(() => {
+    if (!showModal) return
+    const timer = setTimeout(async () => {
+      try {
+        const matches = await suggestExercises({
+          query: exerciseQuery,
+          muscleGroupId: formData.muscleGroup ? parseInt(formData.muscleGroup) : undefined,
+          limit: 50,
+        })
+        setFilteredExercises(matches)
+      } catch (err) {
+        console.error('Error loading exercise suggestions:', err)
+      }
+    }, 150)
+    return () => clearTimeout(timer)
+  }, [showModal, exerciseQuery, formData.muscleGroup])
 
-  // Upon the loading of a new date, fetch sessions, exercises, MGs for that date
+  // Upon the loading of a new date, fetch sessions and MGs for that date
   useEffect(() => {
     const loadData = async () => {
       try {
@@ -53,12 +68,10 @@ export function DayView({ date }: DayViewProps) {
           dateFrom: dateStr,
           dateTo: dateStr,
         })
-        const exercisesData = await fetchExercises()
         const muscleGroupsData = await fetchMuscleGroups()
         
         console.log('Loaded sessions:', sessionsData)
         setSessions(sessionsData)
-        setExercises(exercisesData)
         setMuscleGroups(muscleGroupsData)
       } catch (err) {
         const errorMsg = err instanceof Error ? err.message : 'Failed to load sessions'
@@ -155,6 +168,7 @@ export function DayView({ date }: DayViewProps) {
       
       // Reset form
       setFormData({ muscleGroup: '', exercise: '', weight: '', status: 'Peak' })
+      setExerciseQuery('')
       setShowModal(false)
     } catch (err) {
       console.error('Error details:', err)
@@ -254,6 +268,8 @@ export function DayView({ date }: DayViewProps) {
         onFormChange={(newData) => setFormData({ ...formData, ...newData })}
         muscleGroups={muscleGroups}
         filteredExercises={filteredExercises}
+        exerciseQuery={exerciseQuery}
+        onExerciseQueryChange={setExerciseQuery}
         isSubmitting={submitting}
       />
     </div>
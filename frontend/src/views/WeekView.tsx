@@ -1,4 +1,4 @@
-import { useEffect, useState } from 'react'
+import { useEffect, useMemo, useRef, useState } from 'react'
 import {
   format,
   startOfWeek,
@@ -6,7 +6,7 @@ import {
   eachDayOfInterval,
   isToday,
 } from 'date-fns'
-import { fetchSessions, Session } from '../api/client'
+import { fetchSessions, subscribeToEvents, LiveEvent, Session } from '../api/client'
 
 interface WeekViewProps {
   startDate: Date
@@ -20,58 +20,62 @@ interface DayStats {
   muscleGroups: Set<string>
 }
 
+// Apply a live change from another device to the loaded sessions
+// Returns null when the change can't be applied and the week should be refetched
+function applyEvent(sessions: Session[], event: LiveEvent, weekStart: string, weekEnd: string): Session[] | null {
+  switch (event.type) {
+    case 'session.created':
+    case 'session.updated': {
+      if (!event.data) return null
+      const session = event.data
+      const others = sessions.filter((s) => s.id !== session.id)
+      const inWeek = session.date >= weekStart && session.date <= weekEnd
+      return inWeek ? [...others, session] : others
+    }
+    case 'session.deleted':
+      return sessions.filter((s) => s.id !== event.data.id)
+    case 'entry.created':
+    case 'entry.updated': {
+      const { session_id, entry } = event.data
+      if (!sessions.some((s) => s.id === session_id)) {
+        // Only refetch when the session might belong to this week but isn't loaded
+        return event.type === 'entry.created' ? null : sessions
+      }
+      return sessions.map((s) => s.id !== session_id ? s : {
+        ...s,
+        session_entries: [...s.session_entries.filter((e) => e.id !== entry.id), entry],
+      })
+    }
+    case 'entry.deleted':
+      return sessions.map((s) => s.id !== event.data.session_id ? s : {
+        ...s,
+        session_entries: s.session_entries.filter((e) => e.id !== event.data.id),
+      })
+    default:
+      return null
+  }
+}
+
 export function WeekView({ startDate }: WeekViewProps) {
-  const [stats, setStats] = useState<DayStats[]>([])
+  const [sessions, setSessions] = useState<Session[]>([])
   const [loading, setLoading] = useState(true)
   const [error, setError] = useState<string | null>(null)
+  // Latest sessions for the event handler, which is created once per week
+  const sessionsRef = useRef<Session[]>([])
+  sessionsRef.current = sessions
+
+  const weekStartKey = format(startOfWeek(startDate, { weekStartsOn: 1 }), 'yyyy-MM-dd')
+  const weekEndKey = format(endOfWeek(startDate, { weekStartsOn: 1 }), 'yyyy-MM-dd')
 
   useEffect(() => {
     const loadData = async () => {
       try {
-        setLoading(true)
         setError(null)
-
-        const weekStart = startOfWeek(startDate, { weekStartsOn: 1 })
-        const weekEnd = endOfWeek(startDate, { weekStartsOn: 1 })
-
         const data = await fetchSessions({
-          dateFrom: format(weekStart, 'yyyy-MM-dd'),
-          dateTo: format(weekEnd, 'yyyy-MM-dd'),
-        })
-
-        // Group by date
-        const dateMap = new Map<string, Session[]>()
-        data.forEach((session) => {
-          const dateKey = session.date
-          if (!dateMap.has(dateKey)) {
-            dateMap.set(dateKey, [])
-          }
-          dateMap.get(dateKey)!.push(session)
+          dateFrom: weekStartKey,
+          dateTo: weekEndKey,
         })
-
-        // Create stats for each day of the week
-        const days = eachDayOfInterval({ start: weekStart, end: weekEnd })
-        const dayStats = days.map((day) => {
-          const dateKey = format(day, 'yyyy-MM-dd')
-          const sessions = dateMap.get(dateKey) || []
-
-          const muscleGroups = new Set<string>()
-          sessions.forEach((session) => {
-            session.session_entries.forEach((entry) => {
-              muscleGroups.add(entry.exercise.muscle_group.muscle_group_name)
-            })
-          })
-
-          return {
-            date: day,
-            exercises: sessions.reduce((total, s) => total + s.session_entries.length, 0),
-            sessions: sessions.length,
-            completed: sessions.some((s) => s.completed),
-            muscleGroups,
-          }
-        })
-
-        setStats(dayStats)
+        setSessions(data)
       } catch (err) {
         setError(err instanceof Error ? err.message : 'Failed to load sessions')
       } finally {
@@ -79,8 +83,57 @@ export function WeekView({ startDate }: WeekViewProps) {
       }
     }
 
+    setLoading(true)
     loadData()
-  }, [startDate])
+
+    // Patch in changes made elsewhere (e.g. sets logged on a phone) as they happen
+    const unsubscribe = subscribeToEvents((event) => {
+      const patched = applyEvent(sessionsRef.current, event, weekStartKey, weekEndKey)
+      if (patched === null) {
+        loadData()
+      } else {
+        setSessions(patched)
+      }
+    })
+    return unsubscribe
+  }, [weekStartKey, weekEndKey])
+
+  const stats = useMemo<DayStats[]>(() => {
+    const weekStart = startOfWeek(startDate, { weekStartsOn: 1 })
+    const weekEnd = endOfWeek(startDate, { weekStartsOn: 1 })
+
+    // Group by date
+    const dateMap = new Map<string, Session[]>()
+    sessions.forEach((session) => {
+      const dateKey = session.date
+      if (!dateMap.has(dateKey)) {
+        dateMap.set(dateKey, [])
+      }
+      dateMap.get(dateKey)!.push(session)
+    })
+
+    // Create stats for each day of the week
+    const days = eachDayOfInterval({ start: weekStart, end: weekEnd })
+    return days.map((day) => {
+      const dateKey = format(day, 'yyyy-MM-dd')
+      const daySessions = dateMap.get(dateKey) || []
+
+      const muscleGroups = new Set<string>()
+      daySessions.forEach((session) => {
+        session.session_entries.forEach((entry) => {
+          muscleGroups.add(entry.exercise.muscle_group.muscle_group_name)
+        })
+      })
+
+      return {
+        date: day,
+        exercises: daySessions.reduce((total, s) => total + s.session_entries.length, 0),
+        sessions: daySessions.length,
+        completed: daySessions.some((s) => s.completed),
+        muscleGroups,
+      }
+    })
+  }, [sessions, startDate])
 
   if (loading) {
     return (
@@ -1,6 +1,13 @@
 """
 ASGI config for program_viewer project.
 It exposes the ASGI callable as a module-level variable named ``application``.
+
+Serve with an ASGI server so the async endpoints under /api/async/ run on the
+event loop, e.g.:
+
+    uvicorn program_viewer.asgi:application --workers 4
+
+The DRF viewsets keep working unchanged (Django runs them in a thread pool).
 """
 
 from django.core.asgi import get_asgi_application
@@ -1,3 +1,4 @@
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,15 +44,25 @@ REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ],
+    'DEFAULT_THROTTLE_CLASSES': [
+        'api.throttling.TokenBucketThrottle',
+    ],
+    # Reverse proxies in front of the app that append to X-Forwarded-For. Anonymous
+    # clients are identified by the address the outermost one saw (REMOTE_ADDR when 0)
+    'NUM_PROXIES': int(os.environ.get('NUM_PROXIES', 0)),
 }
 
 MIDDLEWARE = [
+    'base.middleware.PerformanceMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'corsheaders.middleware.CorsMiddleware',
+    # After CORS, so browsers on other origins can read its 429/503s and Retry-After
+    'base.middleware.ConcurrencyLimitMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'base.middleware.RequestProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -90,6 +101,90 @@ DATABASES = {
     }
 }
 
+# Read replicas: DB_REPLICA_HOSTS="host:port,host:port" adds replica_1, replica_2, ...
+# with the same credentials as default. Safe requests on the session, entry and
+# exercise viewsets read from them (see base/db_routers.py)
+for _n, _host in enumerate(filter(None, os.environ.get('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    _host, _, _port = _host.strip().partition(':')
+    DATABASES[f'replica_{_n}'] = {
+        **DATABASES['default'],
+        'HOST': _host,
+        'PORT': _port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['base.db_routers.ReplicaRouter']
+
+# 'default' is shared by every web and worker process: catalog/analytics versions and
+# replica pins must agree across processes, so no per-process LocMemCache.
+# REDIS_URL=redis://host:6379/0 uses Redis (needs redis-py); otherwise a table in the
+# primary database (created by migrate).
+# 'throttle' holds the token buckets, which are read and written on every API request:
+# Redis too when configured, otherwise per process rather than extra primary queries
+# (each process then enforces the budgets on its own).
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        },
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+            # Culling removes expired rows first, then whole slices in key order, which
+            # would include the version keys: keep the table well below the limit
+            'OPTIONS': {'MAX_ENTRIES': 100_000, 'CULL_FREQUENCY': 10},
+        },
+        'throttle': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'throttle',
+            'OPTIONS': {'MAX_ENTRIES': 100_000, 'CULL_FREQUENCY': 10},
+        },
+    }
+
+# After a write, keep that user's reads on the primary for this long (read-your-writes)
+REPLICA_PIN_SECONDS = 5
+
+
+# Tenancy backend for sessions/entries (see base/utils/tenancy.py):
+# 'schema' = one user_N schema per user, 'shared' = shared partitioned tables with RLS
+TENANCY_BACKEND = 'schema'
+
+# Create new tenants from a background job instead of inside the register request
+PROVISION_TENANTS_ASYNC = False
+
+# Whole months of history older than this are compacted by `manage.py archive_history`
+ARCHIVE_HORIZON_DAYS = 365
+
+# Background jobs (base/jobs.py): uploads and exports. Must be shared by the API and the workers
+JOB_FILES_DIR = BASE_DIR / 'job_files'
+
+# Normalised legacy imports cached as Arrow files keyed by the source CSVs' hashes
+# (needs pyarrow; None disables the cache)
+LEGACY_CACHE_DIR = BASE_DIR / 'legacy_cache'
+# Entries kept (least recently used are evicted)
+LEGACY_CACHE_MAX_ENTRIES = 20
+
+
+# Log the app's own messages (job workers, post-import maintenance) to the console
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'base': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -141,6 +236,44 @@ CORS_ALLOWED_ORIGINS = [
 
 CORS_ALLOW_CREDENTIALS = True
 
+# Performance metrics
+# Scrapers (e.g. Prometheus) read /api/_metrics without staff credentials by sending
+# "X-Metrics-Token: <token>"; an empty token disables this
+METRICS_SCRAPE_TOKEN = os.environ.get('METRICS_SCRAPE_TOKEN', '')
+# Optionally also trust these REMOTE_ADDRs. Empty by default: behind a local reverse
+# proxy every request would arrive from 127.0.0.1
+METRICS_ALLOWED_IPS = []
+
+# On-demand request profiling (see base.middleware.RequestProfilingMiddleware)
+# Staff requests sending "X-Profile-Request: 1" are always profiled
+PROFILING_HEADER = 'HTTP_X_PROFILE_REQUEST'
+PROFILING_SAMPLE_RATE = 0.0
+PROFILING_PATH_PREFIXES = ('/api/',)
+PROFILING_DIR = BASE_DIR / 'profiles'
+# Also write SQL parameter values into captures. Off by default: they include password
+# hashes, emails and notes. Only enable on non-production data
+PROFILING_CAPTURE_PARAMS = False
+PROFILING_MAX_CAPTURES = 200
+
+# Admission control (see api/throttling.py and base.middleware.ConcurrencyLimitMiddleware)
+# Token buckets per user (per IP when anonymous): scope -> (capacity, refill tokens/second).
+# Requests spend their view's throttle cost from 'user' and from their view's throttle_scope,
+# and only if both buckets can pay
+THROTTLING_ENABLED = True
+THROTTLE_BUCKETS = {
+    'user': (200, 5.0),
+    'sessions': (60, 1.0),      # unbounded session/entry lists cost 10, ranges 1 per 90 days
+    'analytics': (30, 0.5),
+    'jobs': (60, 1.0),          # submitting an import/export costs 20
+    'register': (60, 1 / 20),   # per IP; a registration (schema DDL) costs 20
+}
+# In-flight requests per process (503 beyond it; keep <= the connections a worker can hold)
+# and per user (429 beyond it). None disables either limit
+MAX_CONCURRENT_REQUESTS = 32
+MAX_CONCURRENT_REQUESTS_PER_USER = 4
+CONCURRENCY_LIMIT_PATH_PREFIXES = ('/api/',)
+LOAD_SHED_RETRY_AFTER = 1
+
 # JWT Configuration
 from datetime import timedelta
 
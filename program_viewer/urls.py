@@ -11,6 +11,8 @@ urlpatterns = [
     path('api/auth/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/auth/me/', UserDetailView.as_view(), name='user_detail'),
     path('api/auth/logout/', LogoutView.as_view(), name='logout'),
+    # Async read endpoints (served natively under ASGI)
+    path('api/async/', include('api.async_urls')),
     # API endpoints (SessionViewSet, ExerciseViewSet, etc.)
     path('api/', include('api.urls')),
 ]